@@ -6,8 +6,8 @@ Automates parsing of all 7 years (2019-2025) of RVU and GPCI data from source CS
 then builds the consolidated RVU timeline.
 
 This script:
-1. Parses all 7 years of RVU CSVs into per-year JSON files
-2. Parses all 7 years of GPCI CSVs into per-year JSON files
+1. Parses all 7 years of RVU CSVs into per-year JSON files (years run in parallel)
+2. Parses all 7 years of GPCI CSVs into per-year JSON files (years run in parallel)
 3. Builds the consolidated rvu_timeline_2019_2025.json
 4. Updates metadata.json
 
@@ -15,17 +15,36 @@ Usage:
     python3 scripts/build_all_data.py
 """
 
-import subprocess
+import hashlib
+import os
 import sys
 import json
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
 from pathlib import Path
 from datetime import datetime, timezone
 
+import build_rvu_timeline
+import parse_cms_data
+
+try:
+    import orjson
+except ImportError:  # optional speedup; the stdlib encoder is the baseline
+    orjson = None
+
 # Source data directories
 SOURCE_RVU_DIR = "/Users/philipsun/Downloads/RVU DATA/RVUs by year"
 SOURCE_GPCI_DIR = "/Users/philipsun/Downloads/RVU DATA/GPCIs"
 OUTPUT_DIR = "app/data/processed"
 
+# Causal hashes of the inputs behind each generated file (see causal_key)
+BUILD_CACHE_NAME = ".build_cache.json"
+BUILD_CACHE_PATH = f"{OUTPUT_DIR}/{BUILD_CACHE_NAME}"
+
+# Each year parses independently, so run up to one worker per year
+MAX_WORKERS = min(7, os.cpu_count() or 1)
+
 # File mappings
 RVU_FILES = {
     2019: "PPRRVU19_OCT.csv",
@@ -48,120 +67,246 @@ GPCI_FILES = {
 }
 
 
-def run_command(cmd, description):
-    """Run a shell command and handle errors"""
-    print(f"\n{'='*60}")
-    print(f"{description}")
-    print(f"{'='*60}")
-    print(f"Running: {' '.join(cmd)}\n")
+def file_sha256(path):
+    """SHA-256 of a file, read in 1 MiB chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def causal_key(*paths):
+    """Combined hash of every file an output is derived from.
+
+    Pass the source data and the script that transforms it, so editing either
+    one invalidates the cached output.
+    """
+    return combine_digests(file_sha256(path) for path in paths)
+
+
+def combine_digests(digests):
+    """Fold per-file SHA-256 hex digests into one causal key"""
+    digest = hashlib.sha256()
+    for file_digest in digests:
+        digest.update(file_digest.encode())
+    return digest.hexdigest()
+
+
+# metadata.json is small and read by people, so it stays indented; both
+# branches produce the same bytes
+if orjson is not None:
+    def json_bytes(data):
+        """Serialize metadata the way it is stored on disk (indent=2, trailing newline)"""
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+else:
+    def json_bytes(data):
+        """Serialize metadata the way it is stored on disk (indent=2, trailing newline)"""
+        return (json.dumps(data, indent=2, ensure_ascii=False) + '\n').encode()
+
+
+def load_build_cache(cache_path=None):
+    """Load the {output filename: causal key} map from the last build"""
+    cache_path = Path(cache_path or BUILD_CACHE_PATH)
+    if not cache_path.exists():
+        return {}
+    try:
+        return parse_cms_data.decode_json(cache_path.read_bytes())
+    except (OSError, ValueError):
+        print(f"WARNING: Ignoring unreadable build cache: {cache_path}")
+        return {}
+
+
+def save_build_cache(cache, cache_path=None):
+    """Atomically write the build cache (tmpfile + os.replace)"""
+    cache_path = Path(cache_path or BUILD_CACHE_PATH)
+    tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_path, cache_path)
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
 
-    if result.returncode != 0:
-        print(f"ERROR: Command failed with exit code {result.returncode}")
-        print(f"STDERR: {result.stderr}")
-        return False
+def list_dir(path):
+    """Names of the entries in a directory, read with one scandir call.
 
-    print(result.stdout)
-    if result.stderr:
-        print(f"Warnings: {result.stderr}")
+    Checking membership in this set replaces a stat() per expected file,
+    which adds up on network-mounted source directories.
+    """
+    with os.scandir(path) as entries:
+        return {entry.name for entry in entries}
 
-    return True
 
+class LinePrefixer:
+    """Stdout stand-in that forwards each complete line with a prefix.
 
-def parse_rvu_files():
-    """Parse all RVU CSV files into JSON"""
-    print("\n" + "="*60)
-    print("PHASE 1: PARSING RVU DATA FILES")
-    print("="*60)
+    Worker processes share the console, so tagging every line with its year
+    keeps interleaved progress readable while it streams.
+    """
 
-    for year, filename in sorted(RVU_FILES.items()):
-        input_path = f"{SOURCE_RVU_DIR}/{filename}"
-        output_path = f"{OUTPUT_DIR}/rvu_data_{year}.json"
+    def __init__(self, stream, prefix):
+        self.stream = stream
+        self.prefix = prefix
+        self.partial = ''
+
+    def write(self, text):
+        *lines, self.partial = (self.partial + text).split('\n')
+        if lines:
+            self.stream.write(''.join(f"{self.prefix}{line}\n" for line in lines))
+            self.stream.flush()
+        return len(text)
+
+    def flush(self):
+        if self.partial:
+            self.write('\n')
+
+
+def collect_parse_tasks(files, source_dir, prefix, label, cache, source_present, out_present):
+    """List (year, input_path, output_path, key) for every year that needs parsing"""
+    parser_path = parse_cms_data.__file__
+    tasks = []
+    for year, filename in sorted(files.items()):
+        input_path = f"{source_dir}/{filename}"
+        output_name = f"{prefix}_{year}.json"
+        output_path = f"{OUTPUT_DIR}/{output_name}"
 
         # Check if source file exists
-        if not Path(input_path).exists():
+        if filename not in source_present:
             print(f"WARNING: Source file not found: {input_path}")
             continue
 
-        # Skip if output already exists (optional - comment out to force regeneration)
-        if Path(output_path).exists():
-            print(f"✓ {year} RVU data already exists, skipping...")
+        # Skip only if the output was built from this exact CSV + parser
+        key = causal_key(input_path, parser_path)
+        if output_name in out_present and cache.get(output_name) == key:
+            print(f"✓ {year} {label} data is up to date, skipping...")
             continue
 
-        cmd = [
-            "python3",
-            "scripts/parse_cms_data.py",
-            input_path,
-            output_path
-        ]
+        tasks.append((year, input_path, output_path, key))
+    return tasks
 
-        if not run_command(cmd, f"Parsing RVU data for {year}"):
-            print(f"Failed to parse RVU data for {year}")
-            return False
 
-    print("\n✓ All RVU files parsed successfully!")
+def _parse_year(task):
+    """Parse one year in a worker process, streaming its output tagged by year"""
+    year, input_path, output_path, _ = task
+    out = LinePrefixer(sys.stdout, f"[{year}] ")
+    with redirect_stdout(out):
+        try:
+            code = parse_cms_data.parse_file(input_path, output_path)
+        except Exception:  # noqa: BLE001
+            traceback.print_exc(file=out)
+            code = 1
+        out.flush()
+    return year, code
+
+
+def run_parse_tasks(tasks, label, cache):
+    """Parse all years concurrently, streaming each worker's output as it runs"""
+    if not tasks:
+        return True
+
+    years = ", ".join(str(task[0]) for task in tasks)
+    print(f"\n{'='*60}")
+    print(f"Parsing {label} data for {years}")
+    print(f"{'='*60}")
+    sys.stdout.flush()
+
+    keys = {task[0]: (Path(task[2]).name, task[3]) for task in tasks}
+    failed_year = None
+    try:
+        with ProcessPoolExecutor(max_workers=min(MAX_WORKERS, len(tasks))) as executor:
+            futures = [executor.submit(_parse_year, task) for task in tasks]
+            for future in as_completed(futures):
+                # Years cancelled after a failure below have no result
+                if future.cancelled():
+                    continue
+                year, code = future.result()
+                if code == 0:
+                    output_name, key = keys[year]
+                    cache[output_name] = key
+                else:
+                    print(f"[{year}] ERROR: Step failed")
+                    if failed_year is None:
+                        failed_year = year
+                        # Don't start years that are still queued
+                        for pending in futures:
+                            pending.cancel()
+    finally:
+        # Keep the keys of the years that did finish, whatever happened to the rest
+        save_build_cache(cache)
+
+    if failed_year is not None:
+        print(f"Failed to parse {label} data for {failed_year}")
+        return False
     return True
 
 
-def parse_gpci_files():
-    """Parse all GPCI CSV files into JSON"""
+def parse_rvu_files(cache, source_present, out_present):
+    """Parse all RVU CSV files into JSON"""
     print("\n" + "="*60)
-    print("PHASE 2: PARSING GPCI DATA FILES")
+    print("PHASE 1: PARSING RVU DATA FILES")
     print("="*60)
 
-    for year, filename in sorted(GPCI_FILES.items()):
-        input_path = f"{SOURCE_GPCI_DIR}/{filename}"
-        output_path = f"{OUTPUT_DIR}/gpci_data_{year}.json"
+    tasks = collect_parse_tasks(RVU_FILES, SOURCE_RVU_DIR, "rvu_data", "RVU", cache,
+                                source_present, out_present)
+    if not run_parse_tasks(tasks, "RVU", cache):
+        return False
 
-        # Check if source file exists
-        if not Path(input_path).exists():
-            print(f"WARNING: Source file not found: {input_path}")
-            continue
+    print("\n✓ All RVU files parsed successfully!")
+    return True
 
-        # Skip if output already exists (optional - comment out to force regeneration)
-        if Path(output_path).exists():
-            print(f"✓ {year} GPCI data already exists, skipping...")
-            continue
 
-        cmd = [
-            "python3",
-            "scripts/parse_cms_data.py",
-            input_path,
-            output_path
-        ]
+def parse_gpci_files(cache, source_present, out_present):
+    """Parse all GPCI CSV files into JSON"""
+    print("\n" + "="*60)
+    print("PHASE 2: PARSING GPCI DATA FILES")
+    print("="*60)
 
-        if not run_command(cmd, f"Parsing GPCI data for {year}"):
-            print(f"Failed to parse GPCI data for {year}")
-            return False
+    tasks = collect_parse_tasks(GPCI_FILES, SOURCE_GPCI_DIR, "gpci_data", "GPCI", cache,
+                                source_present, out_present)
+    if not run_parse_tasks(tasks, "GPCI", cache):
+        return False
 
     print("\n✓ All GPCI files parsed successfully!")
     return True
 
 
-def build_timeline():
+def build_timeline(cache):
     """Build consolidated RVU timeline from per-year JSON files"""
     print("\n" + "="*60)
     print("PHASE 3: BUILDING RVU TIMELINE")
     print("="*60)
 
-    # Build command with all year inputs
-    cmd = ["python3", "scripts/build_rvu_timeline.py"]
+    # Phase 1 may have just written the per-year files, so list the directory now
+    out_present = list_dir(OUTPUT_DIR)
 
+    year_pairs = []
     for year in sorted(RVU_FILES.keys()):
-        input_path = f"{OUTPUT_DIR}/rvu_data_{year}.json"
-        if Path(input_path).exists():
-            cmd.extend(["--year", str(year), input_path])
+        input_name = f"rvu_data_{year}.json"
+        if input_name in out_present:
+            year_pairs.append((str(year), f"{OUTPUT_DIR}/{input_name}"))
         else:
             print(f"WARNING: Missing RVU data for {year}, timeline will have gaps")
 
-    output_path = f"{OUTPUT_DIR}/rvu_timeline_2019_2025.json"
-    cmd.extend(["--out", output_path])
+    output_name = "rvu_timeline_2019_2025.json"
+    output_path = f"{OUTPUT_DIR}/{output_name}"
 
-    if not run_command(cmd, "Building consolidated RVU timeline"):
+    # Rebuild only when a per-year input or the builder itself changed. The
+    # per-year digests are handed to the builder too, so it only reads inputs
+    # it actually has to re-parse.
+    input_hashes = {path: file_sha256(path) for _, path in year_pairs}
+    key = combine_digests([*input_hashes.values(), file_sha256(build_rvu_timeline.__file__)])
+    if output_name in out_present and cache.get(output_name) == key:
+        print("✓ RVU timeline is up to date, skipping...")
+        return True
+
+    print("\nBuilding consolidated RVU timeline\n")
+    if build_rvu_timeline.run(year_pairs, output_path, known_hashes=input_hashes) != 0:
         print("Failed to build timeline")
         return False
 
+    cache[output_name] = key
+    save_build_cache(cache)
+
     print("\n✓ RVU timeline built successfully!")
     return True
 
@@ -173,20 +318,25 @@ def update_metadata():
     print("="*60)
 
     metadata_path = Path(f"{OUTPUT_DIR}/metadata.json")
+    timeline_path = Path(f"{OUTPUT_DIR}/rvu_timeline_2019_2025.json")
+
+    # Load existing metadata or create new (read once; reused for the no-op check)
+    old_bytes = metadata_path.read_bytes() if metadata_path.exists() else None
+    metadata = parse_cms_data.decode_json(old_bytes) if old_bytes is not None else {}
 
-    # Load existing metadata or create new
-    if metadata_path.exists():
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
+    # Stamp the timeline with when its file was last written, not with "now",
+    # so an unchanged build produces unchanged metadata.
+    if timeline_path.exists():
+        generated = datetime.fromtimestamp(timeline_path.stat().st_mtime, timezone.utc)
     else:
-        metadata = {}
+        generated = datetime.now(timezone.utc)
 
-    # Update with new structure
+    # Shallow-merge the sections this script owns; other keys are kept as-is
     metadata.update({
         "rvu_timeline": {
             "years": list(range(2019, 2026)),
             "sources": {str(year): filename for year, filename in RVU_FILES.items()},
-            "generated_at": datetime.now(timezone.utc).replace(microsecond=0).isoformat(),
+            "generated_at": generated.replace(microsecond=0).isoformat(),
             "description": "Multi-year RVU audit timeline (2019-2025)"
         },
         "calculator": {
@@ -198,14 +348,20 @@ def update_metadata():
             "years_available": list(range(2019, 2026)),
             "sources": {str(year): filename for year, filename in GPCI_FILES.items()},
             "description": "CMS Geographic Practice Cost Indices by State and Medicare Locality"
-        },
-        "last_updated": datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+        }
     })
 
-    # Write updated metadata
-    with open(metadata_path, 'w') as f:
-        json.dump(metadata, f, indent=2, sort_keys=False)
-        f.write('\n')
+    # Nothing to do if the merge reproduces the file byte for byte
+    if old_bytes is not None and json_bytes(metadata) == old_bytes:
+        print(f"✓ Metadata at {metadata_path} is up to date, skipping...")
+        return True
+
+    metadata["last_updated"] = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+    # Write updated metadata (tmpfile + os.replace, like the build cache)
+    tmp_path = metadata_path.with_name(metadata_path.name + '.tmp')
+    tmp_path.write_bytes(json_bytes(metadata))
+    os.replace(tmp_path, metadata_path)
 
     print(f"✓ Updated metadata at {metadata_path}")
     return True
@@ -229,16 +385,23 @@ def main():
     # Create output directory if needed
     Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
 
+    cache = load_build_cache()
+
+    # One directory read each instead of a stat() per expected file
+    rvu_present = list_dir(SOURCE_RVU_DIR)
+    gpci_present = list_dir(SOURCE_GPCI_DIR)
+    out_present = list_dir(OUTPUT_DIR)
+
     # Run all phases
-    if not parse_rvu_files():
+    if not parse_rvu_files(cache, rvu_present, out_present):
         print("\n❌ FAILED: RVU parsing incomplete")
         return 1
 
-    if not parse_gpci_files():
+    if not parse_gpci_files(cache, gpci_present, out_present):
         print("\n❌ FAILED: GPCI parsing incomplete")
         return 1
 
-    if not build_timeline():
+    if not build_timeline(cache):
         print("\n❌ FAILED: Timeline build incomplete")
         return 1
 
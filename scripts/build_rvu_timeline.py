@@ -14,7 +14,8 @@ Input format (per-year JSON):
 
 Output format (timeline JSON):
 {
-  "meta": {"years": [...], "generated_at": "...", "sources": {...}, "total_codes": N},
+  "meta": {"years": [...], "generated_at": "...", "sources": {...}, "sources_hashes": {...},
+           "builder_hash": "...", "status_codes": {"0": null, "1": "new", "2": "existing", "3": "modified"}, "total_codes": N},
   "codes": {
     "99213": {
       "desc": "<canonical desc>",
@@ -23,7 +24,7 @@ Output format (timeline JSON):
       "pe_rvu_fac": [...],
       "pe_rvu_nonfac": [...],
       "mp_rvu": [...],
-      "status": [null, "new", "existing", "modified", ...]
+      "status": [0, 1, 2, 3, ...]
     }
   }
 }
@@ -33,23 +34,55 @@ Status rules (per CPT×Year where the CPT exists that year):
 - "modified": any component changed vs previous present year OR description changed
 - "existing": unchanged vs previous present year
 
-Years before the code exists are null (not backfilled).
+Years before the code exists are null (not backfilled). Status is written as
+the small integer codes in `meta.status_codes`, with 0 for years the code is
+absent.
+
+Rebuilds are incremental: `meta.sources_hashes` records the SHA-256 of each
+input, and on the next run years whose input is unchanged are read back from
+the previous output instead of re-loading and re-validating their snapshot.
+`meta.builder_hash` (SHA-256 of this script) must match too, so a change to
+validation or layout rebuilds every year.
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import math
+import os
 import re
 import sys
+from array import array
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from parse_cms_data import decode_json, encode_json
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional; only needed for --formats parquet
+    pa = pq = None
 
 
 REQUIRED_RVU_FIELDS = ("desc", "work_rvu", "pe_rvu_fac", "pe_rvu_nonfac", "mp_rvu")
+RVU_COMPONENTS = ("work_rvu", "pe_rvu_fac", "pe_rvu_nonfac", "mp_rvu")
+_REQUIRED_KEYS = frozenset(REQUIRED_RVU_FIELDS)
+
+OUTPUT_FORMATS = ("json", "parquet")
+
+# Status is stored as one int8 per CPT×year; readers decode via meta.status_codes.
+STATUS_ABSENT, STATUS_NEW, STATUS_EXISTING, STATUS_MODIFIED = range(4)
+STATUS_NAMES = {
+    str(STATUS_ABSENT): None,
+    str(STATUS_NEW): "new",
+    str(STATUS_EXISTING): "existing",
+    str(STATUS_MODIFIED): "modified",
+}
 
 
 _CODE_RE = re.compile(r"^[0-9A-Z][0-9A-Z]{0,9}$")
@@ -113,8 +146,14 @@ def _parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--indent",
         type=int,
-        default=2,
-        help="JSON indent (default: 2). Use 0 for compact output.",
+        default=0,
+        help="JSON indent (default: 0, compact). Compact output is encoded in one pass, with orjson when installed.",
+    )
+    parser.add_argument(
+        "--formats",
+        default="json",
+        help="Comma-separated outputs: json, parquet (default: json). Parquet is written next "
+        "to --out with a .parquet suffix and requires pyarrow.",
     )
     return parser.parse_args()
 
@@ -151,34 +190,112 @@ def _validate_year_snapshot(year: int, data: Any) -> Dict[str, Dict[str, Any]]:
         raise ValueError(f"Year {year}: expected top-level object (dict)")
     cleaned: Dict[str, Dict[str, Any]] = {}
     for code, row in data.items():
-        if not isinstance(code, str) or not code.strip():
-            continue
-        if not isinstance(row, dict):
+        if not isinstance(code, str) or not isinstance(row, dict):
             continue
-        missing = [k for k in REQUIRED_RVU_FIELDS if k not in row]
-        if missing:
+        key = code.strip().upper()
+        if not key or not row.keys() >= _REQUIRED_KEYS:
             continue
-        cleaned[code.strip().upper()] = {
-            "desc": str(row.get("desc") or "").strip(),
-            "work_rvu": _coerce_float(row.get("work_rvu")),
-            "pe_rvu_fac": _coerce_float(row.get("pe_rvu_fac")),
-            "pe_rvu_nonfac": _coerce_float(row.get("pe_rvu_nonfac")),
-            "mp_rvu": _coerce_float(row.get("mp_rvu")),
+        values = (row["work_rvu"], row["pe_rvu_fac"], row["pe_rvu_nonfac"], row["mp_rvu"])
+        # Fast path: snapshots written by our own parsers already hold floats.
+        if not all(v.__class__ is float for v in values):
+            values = tuple(map(_coerce_float, values))
+        desc = row["desc"]
+        desc = desc.strip() if desc.__class__ is str else str(desc or "").strip()
+        cleaned[key] = {
+            # Interned: most descriptions repeat unchanged across all years, so
+            # every year shares one string and equality checks hit identity.
+            "desc": sys.intern(desc),
+            "work_rvu": values[0],
+            "pe_rvu_fac": values[1],
+            "pe_rvu_nonfac": values[2],
+            "mp_rvu": values[3],
         }
     return cleaned
 
 
-def _nearly_equal(a: float, b: float, tol: float) -> bool:
-    if math.isfinite(a) and math.isfinite(b):
-        return abs(a - b) <= tol
-    return a == b
+def _builder_hash() -> str:
+    """SHA-256 of this script; timelines from a different builder are not reused."""
+
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+
+def _load_previous_timeline(
+    out_path: Path, output_years: List[int], builder_hash: str
+) -> Optional[Dict[str, Any]]:
+    """Return the existing timeline if it can seed an incremental rebuild.
+
+    Falls back to a full rebuild (None) when there is no previous output, it
+    predates `sources_hashes`, it was built for a different year grid, or it
+    was written by a different version of this builder.
+    """
+
+    if not out_path.exists():
+        return None
+    try:
+        previous = decode_json(out_path.read_bytes())
+    except (OSError, ValueError):
+        return None
+    meta = previous.get("meta") if isinstance(previous, dict) else None
+    if not isinstance(meta, dict) or meta.get("years") != output_years:
+        return None
+    if meta.get("builder_hash") != builder_hash:
+        return None
+    if not isinstance(meta.get("sources_hashes"), dict) or not isinstance(previous.get("codes"), dict):
+        return None
+    return previous
+
+
+def _snapshot_from_timeline(previous: Dict[str, Any], idx: int, year: int) -> Dict[str, Dict[str, Any]]:
+    """Rebuild one year's validated snapshot from a previous timeline column."""
+
+    snapshot: Dict[str, Dict[str, Any]] = {}
+    year_key = str(year)
+    for code, entry in previous["codes"].items():
+        # Absent years are 0 (null in timelines written before status codes)
+        if not entry["status"][idx]:
+            continue
+        snapshot[code] = {
+            "desc": sys.intern(entry["desc_overrides"].get(year_key, entry["desc"])),
+            "work_rvu": entry["work_rvu"][idx],
+            "pe_rvu_fac": entry["pe_rvu_fac"][idx],
+            "pe_rvu_nonfac": entry["pe_rvu_nonfac"][idx],
+            "mp_rvu": entry["mp_rvu"][idx],
+        }
+    return snapshot
+
+
+def _write_parquet(
+    path: Path,
+    codes: List[str],
+    canonical_descs: List[Optional[str]],
+    columns: Dict[str, List[array]],
+    status_columns: List[array],
+    output_years: List[int],
+) -> None:
+    """Write the timeline grid as Parquet: one row per CPT, one typed column per (field, year).
+
+    RVU columns are float32 with null where the code is absent; status columns
+    are int8 using the same codes as meta.status_codes. Only the canonical desc
+    is kept (per-year desc_overrides stay in the JSON).
+    """
 
+    table_columns: Dict[str, Any] = {
+        "cpt": pa.array(codes, type=pa.string()),
+        "desc": pa.array([d or "" for d in canonical_descs], type=pa.string()).dictionary_encode(),
+    }
+    for field in RVU_COMPONENTS:
+        for y, column in zip(output_years, columns[field]):
+            # from_pandas=True maps the NaN "absent" marker to null
+            table_columns[f"{field}_{y}"] = pa.array(column, type=pa.float64(), from_pandas=True).cast(pa.float32())
+    for y, column in zip(output_years, status_columns):
+        table_columns[f"status_{y}"] = pa.array(column, type=pa.int8())
 
-def _components_changed(prev: Dict[str, Any], cur: Dict[str, Any], tol: float) -> bool:
-    for k in ("work_rvu", "pe_rvu_fac", "pe_rvu_nonfac", "mp_rvu"):
-        if not _nearly_equal(float(prev[k]), float(cur[k]), tol):
-            return True
-    return False
+    tmp_path = path.with_name(path.name + ".tmp")
+    # Plain encoding + zstd: dictionary pages only add bytes here, since cpt is
+    # unique, descs rarely repeat across codes, and zstd already packs the few
+    # thousand distinct float32 values well. desc still reads back as a dictionary.
+    pq.write_table(pa.table(table_columns), tmp_path, compression="zstd", use_dictionary=False)
+    os.replace(tmp_path, path)
 
 
 def _build_year_inputs(pairs: Iterable[Tuple[str, str]]) -> List[YearInput]:
@@ -193,15 +310,39 @@ def _build_year_inputs(pairs: Iterable[Tuple[str, str]]) -> List[YearInput]:
     return year_inputs
 
 
-def main() -> int:
-    args = _parse_args()
+def run(
+    year_pairs: Iterable[Tuple[str, str]],
+    out: str,
+    years: str = "2019-2025",
+    float_tol: float = 1e-4,
+    indent: int = 0,
+    formats: Sequence[str] = ("json",),
+    known_hashes: Optional[Dict[str, str]] = None,
+) -> int:
+    """Build the timeline from (year, path) pairs and write it to `out`.
+
+    Mirrors the CLI flags so callers such as build_all_data.py can run the
+    build in-process instead of spawning a new interpreter. `known_hashes`
+    maps input paths to SHA-256 digests the caller has already computed, so
+    unchanged years can be reused from the previous timeline without reading
+    their input again.
+    """
+
     try:
-        output_years = _parse_year_range(args.years)
+        output_years = _parse_year_range(years)
     except Exception as exc:  # noqa: BLE001
         print(f"ERROR: {exc}", file=sys.stderr)
         return 2
 
-    year_inputs = _build_year_inputs(args.year)
+    unknown_formats = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+    if unknown_formats or not formats:
+        print(f"ERROR: --formats must be a list of: {', '.join(OUTPUT_FORMATS)}", file=sys.stderr)
+        return 2
+    if "parquet" in formats and pa is None:
+        print("ERROR: Parquet output requires pyarrow (pip install pyarrow)", file=sys.stderr)
+        return 2
+
+    year_inputs = _build_year_inputs(year_pairs)
     input_years = {yi.year for yi in year_inputs}
     missing_inputs = [y for y in output_years if y not in input_years]
     if missing_inputs:
@@ -211,98 +352,171 @@ def main() -> int:
             file=sys.stderr,
         )
 
-    per_year: Dict[int, Dict[str, Dict[str, Any]]] = {}
-    sources: Dict[str, str] = {}
-    for yi in year_inputs:
-        with yi.path.open("r", encoding="utf-8") as f:
-            raw = json.load(f)
-        per_year[yi.year] = _validate_year_snapshot(yi.year, raw)
-        sources[str(yi.year)] = yi.source
-
-    all_codes = set()
-    for year, snapshot in per_year.items():
-        _ = year
-        for code in snapshot.keys():
-            if is_valid_code(code):
-                all_codes.add(code.strip().upper())
+    out_path = Path(out)
+    builder_hash = _builder_hash()
+    previous = _load_previous_timeline(out_path, output_years, builder_hash)
+    previous_hashes = previous["meta"]["sources_hashes"] if previous else {}
 
     years_index = {y: i for i, y in enumerate(output_years)}
 
-    codes_out: Dict[str, Dict[str, Any]] = {}
-    for code in sorted(all_codes):
-        work: List[Optional[float]] = [None] * len(output_years)
-        pe_fac: List[Optional[float]] = [None] * len(output_years)
-        pe_nonfac: List[Optional[float]] = [None] * len(output_years)
-        mp: List[Optional[float]] = [None] * len(output_years)
-        status: List[Optional[str]] = [None] * len(output_years)
-
-        # Canonical desc chosen from the latest year where the code is present.
-        present_years = [y for y in output_years if y in per_year and code in per_year[y]]
-        canonical_desc = ""
-        if present_years:
-            latest_year = present_years[-1]
-            canonical_desc = per_year[latest_year][code]["desc"]
+    per_year: Dict[int, Dict[str, Dict[str, Any]]] = {}
+    sources: Dict[str, str] = {}
+    sources_hashes: Dict[str, str] = {}
+    reused_years: List[int] = []
+    for yi in year_inputs:
+        year_key = str(yi.year)
+        sources[year_key] = yi.source
+        # At most one read per input: the same bytes are hashed and, if needed, parsed.
+        raw_bytes = None
+        digest = known_hashes.get(str(yi.path)) if known_hashes else None
+        if digest is None:
+            raw_bytes = yi.path.read_bytes()
+            digest = hashlib.sha256(raw_bytes).hexdigest()
+        sources_hashes[year_key] = digest
+        if previous and yi.year in years_index and previous_hashes.get(year_key) == digest:
+            per_year[yi.year] = _snapshot_from_timeline(previous, years_index[yi.year], yi.year)
+            reused_years.append(yi.year)
+            continue
+        if raw_bytes is None:
+            raw_bytes = yi.path.read_bytes()
+        per_year[yi.year] = _validate_year_snapshot(yi.year, decode_json(raw_bytes))
+        del raw_bytes
+    previous = None  # drop the old timeline before assembling the new one
+
+    if reused_years:
+        print(f"Reusing unchanged years from previous timeline: {', '.join(map(str, reused_years))}")
+
+    # Structure-of-arrays layout: one flat float64 column per (component, year)
+    # with NaN marking "code absent that year", instead of a dict of lists per
+    # code.
+    # Snapshot keys are already stripped/uppercased, so union them first and
+    # validate each distinct code once; this sorted list is the row order for
+    # the columns and the emitted "codes" object alike.
+    codes = sorted(code for code in set().union(*per_year.values()) if is_valid_code(code))
+    code_index = {code: i for i, code in enumerate(codes)}
+    n_codes = len(codes)
+    empty_column = array("d", [math.nan]) * n_codes
+    columns: Dict[str, List[array]] = {
+        field: [array("d", empty_column) for _ in output_years] for field in RVU_COMPONENTS
+    }
+    desc_columns: List[List[Optional[str]]] = [[None] * n_codes for _ in output_years]
+    status_columns: List[array] = [array("b", bytes(n_codes)) for _ in output_years]
+
+    # Column-major: walk years in order and, within a year, only the codes
+    # present that year. Status is decided in the same pass by comparing
+    # against the last present values per code; exact tuple equality
+    # short-circuits the common unchanged case.
+    tol = float(float_tol)
+    last_desc: List[Optional[str]] = [None] * n_codes
+    last_values: List[Optional[Tuple[float, ...]]] = [None] * n_codes
+    for idx, y in enumerate(output_years):
+        snapshot = per_year.get(y)
+        if not snapshot:
+            continue
+        work, pe_fac, pe_nonfac, mp = (columns[field][idx] for field in RVU_COMPONENTS)
+        year_desc = desc_columns[idx]
+        year_status = status_columns[idx]
+        for code, row in snapshot.items():
+            i = code_index.get(code)
+            if i is None:
+                continue
+            row_desc = row["desc"]
+            values = (row["work_rvu"], row["pe_rvu_fac"], row["pe_rvu_nonfac"], row["mp_rvu"])
+            year_desc[i] = row_desc
+            work[i], pe_fac[i], pe_nonfac[i], mp[i] = values
+
+            prev_values = last_values[i]
+            if prev_values is None:
+                year_status[i] = STATUS_NEW
+            elif last_desc[i] != row_desc:
+                year_status[i] = STATUS_MODIFIED
+            elif prev_values == values or all(
+                math.isclose(a, b, rel_tol=0.0, abs_tol=tol) for a, b in zip(prev_values, values)
+            ):
+                year_status[i] = STATUS_EXISTING
+            else:
+                year_status[i] = STATUS_MODIFIED
+            last_desc[i] = row_desc
+            last_values[i] = values
 
-        desc_overrides: Dict[str, str] = {}
-        prev_row: Optional[Dict[str, Any]] = None
-        prev_desc: Optional[str] = None
+    out_path.parent.mkdir(parents=True, exist_ok=True)
 
-        for y in output_years:
-            idx = years_index[y]
-            row = per_year.get(y, {}).get(code)
-            if row is None:
-                continue
+    if "parquet" in formats:
+        parquet_path = out_path.with_suffix(".parquet")
+        _write_parquet(parquet_path, codes, last_desc, columns, status_columns, output_years)
+        print(f"Wrote timeline: {parquet_path} ({n_codes} codes)")
 
-            work[idx] = float(row["work_rvu"])
-            pe_fac[idx] = float(row["pe_rvu_fac"])
-            pe_nonfac[idx] = float(row["pe_rvu_nonfac"])
-            mp[idx] = float(row["mp_rvu"])
+    if "json" not in formats:
+        return 0
 
-            row_desc = str(row.get("desc") or "")
-            if canonical_desc and row_desc and row_desc != canonical_desc:
+    # Transpose the year columns into per-code rows once, at emit time.
+    rows_by_field = {field: zip(*columns[field]) for field in RVU_COMPONENTS}
+    codes_out: Dict[str, Dict[str, Any]] = {}
+    for i, (code, row_descs, row_status) in enumerate(zip(codes, zip(*desc_columns), zip(*status_columns))):
+        # Canonical desc is the latest year's desc (last_desc after the sweep).
+        canonical_desc = last_desc[i] or ""
+        desc_overrides: Dict[str, str] = {}
+        for y, row_desc in zip(output_years, row_descs):
+            # Record every deviation (even to "") so each year's desc can be
+            # recovered exactly from this output on the next incremental run.
+            if row_desc is not None and row_desc != canonical_desc:
                 desc_overrides[str(y)] = row_desc
 
-            if prev_row is None:
-                status[idx] = "new"
-            else:
-                changed = _components_changed(prev_row, row, tol=float(args.float_tol))
-                desc_changed = (prev_desc or "") != row_desc
-                status[idx] = "modified" if (changed or desc_changed) else "existing"
-
-            prev_row = row
-            prev_desc = row_desc
-
-        codes_out[code] = {
-            "desc": canonical_desc,
-            "desc_overrides": desc_overrides,
-            "work_rvu": work,
-            "pe_rvu_fac": pe_fac,
-            "pe_rvu_nonfac": pe_nonfac,
-            "mp_rvu": mp,
-            "status": status,
-        }
-
-    out = {
+        entry: Dict[str, Any] = {"desc": canonical_desc, "desc_overrides": desc_overrides}
+        # The status row doubles as the presence mask: NaN fill sits exactly
+        # where status is 0. Codes present every year (most of them) copy
+        # their rows whole; only partial rows are masked cell by cell.
+        if STATUS_ABSENT in row_status:
+            for field in RVU_COMPONENTS:
+                entry[field] = [v if s else None for v, s in zip(next(rows_by_field[field]), row_status)]
+        else:
+            for field in RVU_COMPONENTS:
+                entry[field] = list(next(rows_by_field[field]))
+        entry["status"] = list(row_status)
+        codes_out[code] = entry
+
+    timeline = {
         "meta": {
             "years": output_years,
             "generated_at": _now_iso(),
             "sources": sources,
+            "sources_hashes": sources_hashes,
+            "builder_hash": builder_hash,
+            "status_codes": STATUS_NAMES,
             "total_codes": len(codes_out),
             "missing_years": missing_inputs,
         },
         "codes": codes_out,
     }
 
-    out_path = Path(args.out)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    indent = None if int(args.indent) <= 0 else int(args.indent)
-    with out_path.open("w", encoding="utf-8") as f:
-        json.dump(out, f, indent=indent, sort_keys=False)
+    # Write a sibling temp file and swap it in, so a crash mid-write never
+    # leaves a truncated timeline for the app (or the next incremental run).
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        if int(indent) > 0:
+            json.dump(timeline, f, indent=int(indent), ensure_ascii=False, sort_keys=False)
+        else:
+            # Without indent, the whole timeline is encoded in one pass (orjson
+            # when installed, otherwise the stdlib C encoder).
+            f.write(encode_json(timeline))
         f.write("\n")
+    os.replace(tmp_path, out_path)
 
     print(f"Wrote timeline: {out_path} ({len(codes_out)} codes)")
     return 0
 
 
+def main() -> int:
+    args = _parse_args()
+    return run(
+        args.year,
+        args.out,
+        years=args.years,
+        float_tol=args.float_tol,
+        indent=args.indent,
+        formats=[fmt.strip() for fmt in args.formats.split(",") if fmt.strip()],
+    )
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -4,23 +4,30 @@ Quick script to fix RVU data from the 2022 CSV file
 """
 
 import csv
-import json
+import os
+from operator import itemgetter
+
+from parse_cms_data import write_rvu_json
 
 # File paths
 input_csv = "app/data/raw/PPRRVU22_JAN.csv"
 output_json = "app/data/processed/rvu_data_2022.json"
+# Streamed to a temp file first and swapped in once complete
+tmp_json = output_json + ".tmp"
 
-print(f"Processing {input_csv}...")
+sample_codes = ['99213', '99214', '99215']
 
-rvu_data = {}
+print(f"Processing {input_csv}...")
 
-with open(input_csv, 'r', encoding='utf-8-sig') as f:
-    reader = csv.reader(f)
+# Records stream to the output as each HCPCS group completes; see
+# parse_cms_data.write_rvu_json for how modifier rows and non-contiguous
+# repeats are handled.
+count = 0
 
-    # Skip the first 10 header rows
-    for _ in range(10):
-        next(reader)
 
+def records(reader):
+    """RVU tuples for each usable data row"""
+    global count
     # Column indices based on the CSV structure
     # Col 0: HCPCS
     # Col 2: DESCRIPTION
@@ -28,54 +35,54 @@ with open(input_csv, 'r', encoding='utf-8-sig') as f:
     # Col 6: PE RVU NON-FAC
     # Col 8: PE RVU FACILITY
     # Col 10: MP RVU
-
-    count = 0
+    # itemgetter pulls just these columns out of each row in one C call
+    pick_columns = itemgetter(0, 2, 5, 6, 8, 10)
     for row in reader:
         try:
             if len(row) < 11:
                 continue
 
-            cpt_code = row[0].strip()
+            cpt_code, description, work_rvu, pe_nonfac, pe_fac, mp_rvu = pick_columns(row)
+            cpt_code = cpt_code.strip()
             if not cpt_code:
                 continue
 
             # Extract RVU values - convert to float, handle empty/invalid values
-            work_rvu = float(row[5].strip() or 0)
-            pe_nonfac = float(row[6].strip() or 0)
-            pe_fac = float(row[8].strip() or 0)
-            mp_rvu = float(row[10].strip() or 0)
-
-            # Get description
-            description = row[2].strip()
-
-            rvu_data[cpt_code] = {
-                "desc": description,
-                "work_rvu": work_rvu,
-                "pe_rvu_fac": pe_fac,
-                "pe_rvu_nonfac": pe_nonfac,
-                "mp_rvu": mp_rvu
-            }
-
-            count += 1
-            if count % 1000 == 0:
-                print(f"  Processed {count} codes...")
+            record = (cpt_code, description.strip(),
+                      float(work_rvu.strip() or 0),
+                      float(pe_fac.strip() or 0),
+                      float(pe_nonfac.strip() or 0),
+                      float(mp_rvu.strip() or 0))
 
         except (ValueError, IndexError) as e:
             # Skip rows with invalid data
             continue
 
-print(f"Processed {count} total CPT/HCPCS codes")
+        yield record
+
+        count += 1
+        if count % 1000 == 0:
+            print(f"  Processed {count} codes...")
 
-# Write JSON output
-print(f"Writing to {output_json}...")
-with open(output_json, 'w') as f:
-    json.dump(rvu_data, f, indent=2)
+
+with open(input_csv, 'r', encoding='utf-8-sig') as f:
+    reader = csv.reader(f)
+
+    # Skip the first 10 header rows
+    for _ in range(10):
+        next(reader)
+
+    code_count, writer = write_rvu_json(records(reader), tmp_json, keep_codes=sample_codes)
+
+os.replace(tmp_json, output_json)
+
+print(f"Processed {count} total CPT/HCPCS codes")
+print(f"Wrote {code_count} unique codes to {output_json}")
 
 print("✓ Done!")
 
 # Show sample data for verification
 print("\nSample entries:")
-sample_codes = ['99213', '99214', '99215']
 for code in sample_codes:
-    if code in rvu_data:
-        print(f"  {code}: {rvu_data[code]}")
+    if code in writer.kept:
+        print(f"  {code}: {writer.kept[code]}")
@@ -1,14 +1,45 @@
 #!/usr/bin/env python3
 """
 Quick inspector to see the structure of CMS Excel files
+
+Uses python-calamine (Rust-backed reader) when installed, otherwise openpyxl.
 """
-import openpyxl
 import sys
 
-def inspect_excel(filepath):
-    print(f"\n{'='*60}")
-    print(f"Inspecting: {filepath}")
-    print('='*60)
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # optional speedup; openpyxl is the baseline reader
+    CalamineWorkbook = None
+
+
+def print_rows(rows):
+    """Print the preview rows (readers bound them to 10), first 15 columns each"""
+    print("\nFirst 10 rows:")
+    for i, row in enumerate(rows, 1):
+        # Clean up None values for display
+        cleaned = [str(cell) if cell is not None else '' for cell in row[:15]]  # First 15 cols
+        print(f"Row {i}: {cleaned}")
+
+
+def inspect_with_calamine(filepath):
+    wb = CalamineWorkbook.from_path(filepath)
+
+    print(f"\nSheets: {wb.sheet_names}")
+
+    for sheet_name in wb.sheet_names:
+        print(f"\n--- Sheet: {sheet_name} ---")
+        sheet = wb.get_sheet_by_name(sheet_name)
+
+        # Get dimensions
+        print(f"Max row: {sheet.height}, Max col: {sheet.width}")
+
+        print_rows(sheet.to_python(skip_empty_area=False, nrows=10))
+
+        print()
+
+
+def inspect_with_openpyxl(filepath):
+    import openpyxl
 
     wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
 
@@ -21,17 +52,22 @@ def inspect_excel(filepath):
         # Get dimensions
         print(f"Max row: {sheet.max_row}, Max col: {sheet.max_column}")
 
-        # Show first 10 rows
-        print("\nFirst 10 rows:")
-        for i, row in enumerate(sheet.iter_rows(values_only=True), 1):
-            if i > 10:
-                break
-            # Clean up None values for display
-            cleaned = [str(cell) if cell is not None else '' for cell in row[:15]]  # First 15 cols
-            print(f"Row {i}: {cleaned}")
+        # Bound the read so openpyxl never parses cells past the preview
+        print_rows(sheet.iter_rows(min_row=1, max_row=10, max_col=15, values_only=True))
 
         print()
 
+
+def inspect_excel(filepath):
+    print(f"\n{'='*60}")
+    print(f"Inspecting: {filepath}")
+    print('='*60)
+
+    if CalamineWorkbook is not None:
+        inspect_with_calamine(filepath)
+    else:
+        inspect_with_openpyxl(filepath)
+
 if __name__ == '__main__':
     if len(sys.argv) < 2:
         print("Usage: python inspect_excel.py <file.xlsx>")
@@ -16,27 +16,80 @@ Expected CSV columns for RVU data:
     - MP RVU (or Malpractice RVU)
 
 The script will attempt to auto-detect column names with flexible matching.
+JSON is encoded and decoded with orjson when installed, otherwise the stdlib
+json module.
 """
 
 import csv
+import io
 import json
+import os
 import sys
 import re
+from functools import lru_cache
+from itertools import chain, islice
+from operator import itemgetter
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # optional speedup; the stdlib encoder is the baseline
+    orjson = None
+
+# Output files are written through a 1 MiB buffer instead of the 8 KiB default
+IO_BUFFER_SIZE = 1 << 20
+
+if orjson is not None:
+    def encode_json(obj):
+        """Compact JSON text for obj"""
+        return orjson.dumps(obj).decode()
+
+    # Accepts bytes or str; errors are JSONDecodeError (a ValueError) either way
+    decode_json = orjson.loads
+else:
+    # Same bytes as orjson: compact, with non-ASCII text left as UTF-8
+    encode_json = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+    decode_json = json.loads
+
+
+def json_text(data):
+    """Compact JSON text for a dict, one top-level entry per line
+
+    This is the same layout RecordStreamWriter produces, so every output file
+    can be grepped or line-indexed per record while remaining one JSON object.
+    """
+    if not data:
+        return '{}\n'
+    entries = ',\n'.join(f"{encode_json(key)}:{encode_json(value)}" for key, value in data.items())
+    return f"{{\n{entries}\n}}\n"
+
+
+def write_json(data, output_path):
+    """Write a dict to output_path in the json_text layout"""
+    with open(output_path, 'w', encoding='utf-8', buffering=IO_BUFFER_SIZE) as out:
+        out.write(json_text(data))
+
+
+# ASCII bytes other than [a-z0-9], deleted by bytes.translate in normalize_header
+_HEADER_KEEP = b'abcdefghijklmnopqrstuvwxyz0123456789'
+_HEADER_DROP = bytes(b for b in range(128) if b not in _HEADER_KEEP)
+
 
 def normalize_header(header):
     """Normalize column header for flexible matching"""
-    return re.sub(r'[^a-z0-9]', '', header.lower())
+    # Non-ASCII characters are dropped by the encode, the rest by translate
+    return header.lower().encode('ascii', 'ignore').translate(None, _HEADER_DROP).decode('ascii')
 
 
-def find_column(headers, *patterns):
-    """Find column index by matching against multiple patterns"""
-    normalized = [normalize_header(h) for h in headers]
+def find_column(normalized_headers, *patterns):
+    """Find column index by matching against multiple patterns
 
+    `normalized_headers` is the header row already passed through
+    normalize_header, so it is normalized once rather than per lookup.
+    """
     for pattern in patterns:
         pattern_norm = normalize_header(pattern)
-        for idx, header in enumerate(normalized):
+        for idx, header in enumerate(normalized_headers):
             if not header:
                 continue
             if pattern_norm in header or header in pattern_norm:
@@ -44,11 +97,166 @@ def find_column(headers, *patterns):
     return None
 
 
-def parse_rvu_csv(csv_path, output_path):
-    """Parse RVU CSV file into JSON format"""
-
-    print(f"Reading CSV file: {csv_path}")
-
+# Removes any non-numeric characters except . and -
+_STRIP_NON_NUMERIC = re.compile(r'[^\d.\-]').sub
+
+
+def parse_number(val, default):
+    """Parse a numeric cell, ignoring stray characters such as '$' or spaces.
+
+    Returns `default` when the cell holds no number.
+    """
+    if not val:
+        return default
+    # Fast path: most CMS cells are already clean numbers. Only finite
+    # results are taken here; 'nan'/'inf' go through the cleanup like any
+    # other text.
+    try:
+        num = float(val)
+        if num - num == 0.0:
+            return num
+    except ValueError:
+        pass
+    val = _STRIP_NON_NUMERIC('', val)
+    try:
+        return float(val) if val else default
+    except ValueError:
+        return default
+
+
+@lru_cache(maxsize=1 << 16)
+def rvu_number(val):
+    """parse_number(val, 0.0), memoized.
+
+    RVU columns repeat a few thousand distinct values across hundreds of
+    thousands of cells, so most cells are a cache hit instead of a parse.
+    """
+    return parse_number(val, 0.0)
+
+
+class RecordStreamWriter:
+    """Stream a {code: record} JSON object to a file, one member per line.
+
+    Records are written as rows are parsed instead of being collected into a
+    dict and dumped at the end, so memory stays flat. CMS lists every modifier
+    row of a code together and the last row wins, so each code is held until
+    the next code starts. A code that reappears after other codes still gets
+    its last row, as with a dict: its member stays where it was first written
+    and the new record is held in `late`, for the caller to patch into the
+    output after close() (see write_rvu_json).
+
+    With `make_record`, add() takes the raw row and the record is only built
+    for rows that are actually written, not for superseded modifier rows.
+    """
+
+    def __init__(self, out, keep_codes=(), head_size=5, make_record=None):
+        self.out = out
+        self.encode = encode_json
+        self.make_record = make_record
+        self.written = set()
+        self.pending = None
+        self.keep_codes = set(keep_codes)
+        self.kept = {}  # final records for keep_codes, for sample output
+        self.head_size = head_size
+        self.head = []  # first (code, record) pairs written, for sample output
+        self.late = {}  # {code: last row} for codes seen again after being written
+
+    def add(self, code, record):
+        if self.pending is not None and self.pending[0] != code:
+            self._write(*self.pending)
+            self.pending = None
+        if code in self.written:
+            if code not in self.late:
+                print(f"Warning: rows for {code} are not contiguous, the last row wins")
+            self.late[code] = record
+            return
+        self.pending = (code, record)
+
+    def _write(self, code, record):
+        if self.make_record is not None:
+            record = self.make_record(record)
+        self.out.write(',\n' if self.written else '{\n')
+        self.out.write(f"{self.encode(code)}:{self.encode(record)}")
+        self.written.add(code)
+        if len(self.head) < self.head_size:
+            self.head.append((code, record))
+        if code in self.keep_codes:
+            self.kept[code] = record
+
+    def close(self):
+        """Flush the last code, close the object and return the number of codes.
+
+        `late` then holds the final record of each code whose written member
+        is out of date.
+        """
+        if self.pending is not None:
+            self._write(*self.pending)
+            self.pending = None
+        self.out.write('\n}\n' if self.written else '{}\n')
+        if self.make_record is not None:
+            self.late = {code: self.make_record(row) for code, row in self.late.items()}
+        for code, record in self.late.items():
+            if code in self.keep_codes:
+                self.kept[code] = record
+        self.head = [(code, self.late.get(code, record)) for code, record in self.head]
+        return len(self.written)
+
+
+def patch_records(output_path, records, encode=encode_json):
+    """Rewrite the members of a RecordStreamWriter file whose code is in records.
+
+    Only needed when a code's rows are not contiguous, which CMS files do not
+    normally have, so the common case never pays for a second pass.
+    """
+    members = {f"{encode(code)}:": encode(record) for code, record in records.items()}
+    tmp_path = f"{output_path}.tmp"
+    with open(output_path, 'r', encoding='utf-8') as src, \
+            open(tmp_path, 'w', encoding='utf-8', buffering=IO_BUFFER_SIZE) as dst:
+        for line in src:
+            key = line[:line.find('":') + 2]
+            if key in members:
+                comma = ',' if line.endswith(',\n') else ''
+                line = f"{key}{members[key]}{comma}\n"
+            dst.write(line)
+    os.replace(tmp_path, output_path)
+
+
+def rvu_record(row):
+    """JSON record for a (code, desc, work, pe_fac, pe_nonfac, mp) tuple"""
+    return {
+        "desc": row[1],
+        "work_rvu": row[2],
+        "pe_rvu_fac": row[3],
+        "pe_rvu_nonfac": row[4],
+        "mp_rvu": row[5]
+    }
+
+
+def write_rvu_json(records, output_path, keep_codes=()):
+    """Stream RVU records to output_path and return (code count, writer).
+
+    `records` yields (code, desc, work, pe_fac, pe_nonfac, mp) tuples. The CSV
+    and Excel parsers both write through here.
+    """
+    with open(output_path, 'w', encoding='utf-8', buffering=IO_BUFFER_SIZE) as out:
+        # Rows stay flat tuples until written; dicts are built once per code
+        writer = RecordStreamWriter(out, keep_codes=keep_codes, make_record=rvu_record)
+        add = writer.add
+        for row in records:
+            add(row[0], row)
+        code_count = writer.close()
+    if writer.late:
+        patch_records(output_path, writer.late, writer.encode)
+    return code_count, writer
+
+
+def open_csv_text(csv_path):
+    """Read a CSV file once and return its decoded text as a file-like object.
+
+    The bytes are read from disk a single time and each candidate encoding is
+    tried on them in memory, instead of re-reading the whole file per attempt.
+    Returns None if no encoding works.
+    """
     # Try multiple encodings to handle different file formats
     # Use latin-1 which can handle all byte values, or utf-8 with error replacement
     encodings_to_try = [
@@ -59,23 +267,29 @@ def parse_rvu_csv(csv_path, output_path):
         ('utf-8', 'replace'),  # Fallback: replace bad characters
     ]
 
-    f = None
+    try:
+        raw = Path(csv_path).read_bytes()
+    except OSError:
+        return None
+
     for encoding, errors in encodings_to_try:
         try:
-            f = open(csv_path, 'r', encoding=encoding, errors=errors)
-            # Try to read entire file to verify encoding works
-            content = f.read()
-            f.close()
-            # Reopen for actual processing
-            f = open(csv_path, 'r', encoding=encoding, errors=errors)
-            print(f"Successfully opened file with encoding={encoding}, errors={errors}")
-            break
-        except (UnicodeDecodeError, Exception) as e:
-            if f:
-                f.close()
-            f = None
+            text = raw.decode(encoding, errors)
+        except UnicodeDecodeError:
             continue
+        print(f"Successfully opened file with encoding={encoding}, errors={errors}")
+        # newline=None translates \r\n and \r like open() in text mode did
+        return io.StringIO(text, newline=None)
 
+    return None
+
+
+def parse_rvu_csv(csv_path, output_path):
+    """Parse RVU CSV file into JSON format"""
+
+    print(f"Reading CSV file: {csv_path}")
+
+    f = open_csv_text(csv_path)
     if f is None:
         print(f"ERROR: Could not open file with any supported encoding")
         sys.exit(1)
@@ -89,12 +303,13 @@ def parse_rvu_csv(csv_path, output_path):
         print(f"Headers: {headers[:5]}...")  # Show first 5
 
         # Auto-detect column indices
-        cpt_idx = find_column(headers, 'cpt', 'hcpcs', 'code', 'cpt/hcpcs', 'cpthcpcs')
-        desc_idx = find_column(headers, 'description', 'desc', 'descriptor')
-        work_idx = find_column(headers, 'work rvu', 'workrvu', 'work')
-        pe_fac_idx = find_column(headers, 'pe rvu facility', 'perfacility', 'pe fac', 'facility pe')
-        pe_nonfac_idx = find_column(headers, 'pe rvu non-facility', 'pe rvu nonfacility', 'penonfacility', 'non-facility pe', 'nonfacility pe')
-        mp_idx = find_column(headers, 'mp rvu', 'mprvu', 'malpractice rvu', 'malpractice', 'mp')
+        normalized = [normalize_header(h) for h in headers]
+        cpt_idx = find_column(normalized, 'cpt', 'hcpcs', 'code', 'cpt/hcpcs', 'cpthcpcs')
+        desc_idx = find_column(normalized, 'description', 'desc', 'descriptor')
+        work_idx = find_column(normalized, 'work rvu', 'workrvu', 'work')
+        pe_fac_idx = find_column(normalized, 'pe rvu facility', 'perfacility', 'pe fac', 'facility pe')
+        pe_nonfac_idx = find_column(normalized, 'pe rvu non-facility', 'pe rvu nonfacility', 'penonfacility', 'non-facility pe', 'nonfacility pe')
+        mp_idx = find_column(normalized, 'mp rvu', 'mprvu', 'malpractice rvu', 'malpractice', 'mp')
 
         # Validate required columns found
         if cpt_idx is None:
@@ -115,64 +330,136 @@ def parse_rvu_csv(csv_path, output_path):
         if mp_idx is not None:
             print(f"  MP RVU: Column {mp_idx} ({headers[mp_idx]})")
 
-        # Parse data
-        rvu_data = {}
+        # Pull all six cells with one C-level itemgetter call per row instead
+        # of a bounds-checked lookup per cell. Short rows are padded with
+        # blanks, and a column the file lacks reads from a blank slot just
+        # past the last used column.
+        indices = (cpt_idx, desc_idx, work_idx, pe_fac_idx, pe_nonfac_idx, mp_idx)
+        blank = max(idx for idx in indices if idx is not None) + 1
+        pick_cells = itemgetter(*(blank if idx is None else idx for idx in indices))
+        has_missing = None in indices
+        padding = [''] * (blank + 1)
+
         skipped = 0
 
-        for row_num, row in enumerate(reader, start=2):
-            try:
-                if len(row) <= cpt_idx:
+        def records():
+            """RVU tuples for each usable data row"""
+            nonlocal skipped
+            for row_num, row in enumerate(reader, start=2):
+                try:
+                    if len(row) <= cpt_idx:
+                        continue
+
+                    if has_missing:
+                        row = row[:blank] + padding[min(len(row), blank):]
+                    elif len(row) < blank:
+                        row += padding[len(row):blank]
+
+                    cpt_code, desc, work, pe_fac, pe_nonfac, mp = pick_cells(row)
+                    cpt_code = cpt_code.strip()
+
+                    # Skip empty codes or header-like rows
+                    if not cpt_code or cpt_code.lower() in ['cpt', 'code', 'hcpcs']:
+                        continue
+
+                    record = (cpt_code, desc.strip(), rvu_number(work), rvu_number(pe_fac),
+                              rvu_number(pe_nonfac), rvu_number(mp))
+
+                except Exception as e:
+                    skipped += 1
+                    if skipped <= 5:  # Show first 5 errors
+                        print(f"Warning: Skipped row {row_num}: {e}")
                     continue
 
-                cpt_code = row[cpt_idx].strip()
+                yield record
 
-                # Skip empty codes or header-like rows
-                if not cpt_code or cpt_code.lower() in ['cpt', 'code', 'hcpcs']:
-                    continue
-
-                # Get values with safe defaults
-                def safe_float(idx):
-                    if idx is None or idx >= len(row):
-                        return 0.0
-                    try:
-                        val = row[idx].strip()
-                        # Remove any non-numeric characters except . and -
-                        val = re.sub(r'[^\d.\-]', '', val)
-                        return float(val) if val else 0.0
-                    except (ValueError, AttributeError):
-                        return 0.0
-
-                def safe_str(idx):
-                    if idx is None or idx >= len(row):
-                        return ""
-                    return row[idx].strip()
-
-                rvu_data[cpt_code] = {
-                    "desc": safe_str(desc_idx),
-                    "work_rvu": safe_float(work_idx),
-                    "pe_rvu_fac": safe_float(pe_fac_idx),
-                    "pe_rvu_nonfac": safe_float(pe_nonfac_idx),
-                    "mp_rvu": safe_float(mp_idx)
-                }
-
-            except Exception as e:
-                skipped += 1
-                if skipped <= 5:  # Show first 5 errors
-                    print(f"Warning: Skipped row {row_num}: {e}")
+        # Parse data, streaming each code to the output as it completes
+        print(f"\nWriting JSON to: {output_path}")
+        code_count, writer = write_rvu_json(records(), output_path)
 
-        print(f"\nParsed {len(rvu_data)} CPT codes")
+        print(f"\nParsed {code_count} CPT codes")
         if skipped > 0:
             print(f"Skipped {skipped} rows due to errors")
 
-        # Write JSON
-        print(f"\nWriting JSON to: {output_path}")
-        with open(output_path, 'w') as out:
-            json.dump(rvu_data, out, indent=2)
-
         print(f"✓ Success! Created {output_path}")
         print(f"\nSample codes included:")
-        for code in list(rvu_data.keys())[:5]:
-            print(f"  - {code}: {rvu_data[code]['desc'][:50]}...")
+        for code, record in writer.head:
+            print(f"  - {code}: {record['desc'][:50]}...")
+
+
+# Used by derive_state_from_name for older GPCI exports without a State column
+_TRAIL_STAR = re.compile(r'\*+$').sub
+_NON_ALPHA_SPACE = re.compile(r'[^A-Z ]').sub
+_STATE_BY_NAME = {
+    'ALABAMA': 'AL',
+    'ALASKA': 'AK',
+    'ARIZONA': 'AZ',
+    'ARKANSAS': 'AR',
+    'CALIFORNIA': 'CA',
+    'COLORADO': 'CO',
+    'CONNECTICUT': 'CT',
+    'DELAWARE': 'DE',
+    'DISTRICT OF COLUMBIA': 'DC',
+    'FLORIDA': 'FL',
+    'GEORGIA': 'GA',
+    'HAWAII': 'HI',
+    'IDAHO': 'ID',
+    'ILLINOIS': 'IL',
+    'INDIANA': 'IN',
+    'IOWA': 'IA',
+    'KANSAS': 'KS',
+    'KENTUCKY': 'KY',
+    'LOUISIANA': 'LA',
+    'MAINE': 'ME',
+    'MARYLAND': 'MD',
+    'MASSACHUSETTS': 'MA',
+    'MICHIGAN': 'MI',
+    'MINNESOTA': 'MN',
+    'MISSISSIPPI': 'MS',
+    'MISSOURI': 'MO',
+    'MONTANA': 'MT',
+    'NEBRASKA': 'NE',
+    'NEVADA': 'NV',
+    'NEW HAMPSHIRE': 'NH',
+    'NEW JERSEY': 'NJ',
+    'NEW MEXICO': 'NM',
+    'NEW YORK': 'NY',
+    'NORTH CAROLINA': 'NC',
+    'NORTH DAKOTA': 'ND',
+    'OHIO': 'OH',
+    'OKLAHOMA': 'OK',
+    'OREGON': 'OR',
+    'PENNSYLVANIA': 'PA',
+    'RHODE ISLAND': 'RI',
+    'SOUTH CAROLINA': 'SC',
+    'SOUTH DAKOTA': 'SD',
+    'TENNESSEE': 'TN',
+    'TEXAS': 'TX',
+    'UTAH': 'UT',
+    'VERMONT': 'VT',
+    'VIRGINIA': 'VA',
+    'WASHINGTON': 'WA',
+    'WEST VIRGINIA': 'WV',
+    'WISCONSIN': 'WI',
+    'WYOMING': 'WY',
+}
+
+
+def derive_state_from_name(locality_name):
+    """Infer 2-letter state code from the Locality Name field (older GPCI exports)."""
+    if not locality_name:
+        return ''
+
+    cleaned = locality_name.strip()
+    cleaned = _TRAIL_STAR('', cleaned).strip()
+
+    if ',' in cleaned:
+        tail = cleaned.rsplit(',', 1)[-1].strip().upper()
+        if len(tail) == 2 and tail.isalpha():
+            return tail
+
+    name_upper = _NON_ALPHA_SPACE('', cleaned.upper()).strip()
+    return _STATE_BY_NAME.get(name_upper, '')
 
 
 def parse_gpci_csv(csv_path, output_path):
@@ -180,33 +467,7 @@ def parse_gpci_csv(csv_path, output_path):
 
     print(f"Reading GPCI CSV file: {csv_path}")
 
-    # Try multiple encodings to handle different file formats
-    # Use latin-1 which can handle all byte values, or utf-8 with error replacement
-    encodings_to_try = [
-        ('utf-8-sig', 'strict'),
-        ('utf-8', 'strict'),
-        ('latin-1', 'strict'),
-        ('cp1252', 'strict'),
-        ('utf-8', 'replace'),  # Fallback: replace bad characters
-    ]
-
-    f = None
-    for encoding, errors in encodings_to_try:
-        try:
-            f = open(csv_path, 'r', encoding=encoding, errors=errors)
-            # Try to read entire file to verify encoding works
-            content = f.read()
-            f.close()
-            # Reopen for actual processing
-            f = open(csv_path, 'r', encoding=encoding, errors=errors)
-            print(f"Successfully opened file with encoding={encoding}, errors={errors}")
-            break
-        except (UnicodeDecodeError, Exception) as e:
-            if f:
-                f.close()
-            f = None
-            continue
-
+    f = open_csv_text(csv_path)
     if f is None:
         print(f"ERROR: Could not open file with any supported encoding")
         sys.exit(1)
@@ -215,7 +476,7 @@ def parse_gpci_csv(csv_path, output_path):
         """Extract the effective header row from a CMS GPCI CSV.
 
         Some CMS exports include preamble/title lines and, in older years, split the header across 2 lines.
-        Returns: (header_start_index, header_line_count, headers, data_start_index)
+        Returns: (header_start_index, header_line_count, headers, normalized_headers, data_start_index)
         """
         scan_limit = min(max_scan, len(rows))
 
@@ -237,7 +498,7 @@ def parse_gpci_csv(csv_path, output_path):
                 continue
 
             if has_gpci_cols(cells):
-                return i, 1, row, i + 1
+                return i, 1, row, cells, i + 1
 
             # Older exports may have GPCI columns on the next row.
             if i + 1 < scan_limit:
@@ -256,103 +517,36 @@ def parse_gpci_csv(csv_path, output_path):
                                 merged.append(b_clean or a_clean)
                             else:
                                 merged.append(a_clean)
-                        return i, 2, merged, i + 2
+                        return i, 2, merged, [normalize_header(c) for c in merged], i + 2
 
         return None
 
-    def derive_state_from_name(locality_name):
-        """Infer 2-letter state code from the Locality Name field (older GPCI exports)."""
-        if not locality_name:
-            return ''
-
-        cleaned = locality_name.strip()
-        cleaned = re.sub(r'\*+$', '', cleaned).strip()
-
-        if ',' in cleaned:
-            tail = cleaned.rsplit(',', 1)[-1].strip().upper()
-            if len(tail) == 2 and tail.isalpha():
-                return tail
-
-        name_upper = re.sub(r'[^A-Z ]', '', cleaned.upper()).strip()
-        state_by_name = {
-            'ALABAMA': 'AL',
-            'ALASKA': 'AK',
-            'ARIZONA': 'AZ',
-            'ARKANSAS': 'AR',
-            'CALIFORNIA': 'CA',
-            'COLORADO': 'CO',
-            'CONNECTICUT': 'CT',
-            'DELAWARE': 'DE',
-            'DISTRICT OF COLUMBIA': 'DC',
-            'FLORIDA': 'FL',
-            'GEORGIA': 'GA',
-            'HAWAII': 'HI',
-            'IDAHO': 'ID',
-            'ILLINOIS': 'IL',
-            'INDIANA': 'IN',
-            'IOWA': 'IA',
-            'KANSAS': 'KS',
-            'KENTUCKY': 'KY',
-            'LOUISIANA': 'LA',
-            'MAINE': 'ME',
-            'MARYLAND': 'MD',
-            'MASSACHUSETTS': 'MA',
-            'MICHIGAN': 'MI',
-            'MINNESOTA': 'MN',
-            'MISSISSIPPI': 'MS',
-            'MISSOURI': 'MO',
-            'MONTANA': 'MT',
-            'NEBRASKA': 'NE',
-            'NEVADA': 'NV',
-            'NEW HAMPSHIRE': 'NH',
-            'NEW JERSEY': 'NJ',
-            'NEW MEXICO': 'NM',
-            'NEW YORK': 'NY',
-            'NORTH CAROLINA': 'NC',
-            'NORTH DAKOTA': 'ND',
-            'OHIO': 'OH',
-            'OKLAHOMA': 'OK',
-            'OREGON': 'OR',
-            'PENNSYLVANIA': 'PA',
-            'RHODE ISLAND': 'RI',
-            'SOUTH CAROLINA': 'SC',
-            'SOUTH DAKOTA': 'SD',
-            'TENNESSEE': 'TN',
-            'TEXAS': 'TX',
-            'UTAH': 'UT',
-            'VERMONT': 'VT',
-            'VIRGINIA': 'VA',
-            'WASHINGTON': 'WA',
-            'WEST VIRGINIA': 'WV',
-            'WISCONSIN': 'WI',
-            'WYOMING': 'WY',
-        }
-        return state_by_name.get(name_upper, '')
-
     with f:
         reader = csv.reader(f)
-        rows = list(reader)
+        # Only the first rows can hold the header; the rest stay on the reader
+        header_scan = 80
+        head = list(islice(reader, header_scan))
 
-        header_info = extract_gpci_headers(rows)
+        header_info = extract_gpci_headers(head, max_scan=header_scan)
         if header_info is None:
             print("ERROR: Could not detect GPCI header row (file may not be a CMS GPCI export)")
             sys.exit(1)
 
-        header_idx, header_line_count, headers, data_start = header_info
-        data_rows = rows[data_start:]
+        header_idx, header_line_count, headers, normalized, data_start = header_info
+        data_rows = chain(head[data_start:], reader)
 
         print(f"Detected header starting at line {header_idx + 1} ({header_line_count} line(s))")
         print(f"Found {len(headers)} columns")
 
         # Auto-detect column indices
-        mac_idx = find_column(headers, 'medicare administrative contractor', 'mac')
-        state_idx = find_column(headers, 'state')
-        locality_num_idx = find_column(headers, 'locality number', 'locality no', 'locality')
-        locality_name_idx = find_column(headers, 'locality name', 'name')
+        mac_idx = find_column(normalized, 'medicare administrative contractor', 'mac')
+        state_idx = find_column(normalized, 'state')
+        locality_num_idx = find_column(normalized, 'locality number', 'locality no', 'locality')
+        locality_name_idx = find_column(normalized, 'locality name', 'name')
 
-        work_gpci_idx = find_column(headers, 'pw gpci', 'work gpci', 'pwgpci', 'workgpci')
-        pe_gpci_idx = find_column(headers, 'pe gpci', 'pegpci', 'practice expense gpci', 'practiceexpensegpci')
-        mp_gpci_idx = find_column(headers, 'mp gpci', 'mpgpci', 'pl gpci', 'plmgpci', 'malpractice gpci', 'malpracticegpci')
+        work_gpci_idx = find_column(normalized, 'pw gpci', 'work gpci', 'pwgpci', 'workgpci')
+        pe_gpci_idx = find_column(normalized, 'pe gpci', 'pegpci', 'practice expense gpci', 'practiceexpensegpci')
+        mp_gpci_idx = find_column(normalized, 'mp gpci', 'mpgpci', 'pl gpci', 'plmgpci', 'malpractice gpci', 'malpracticegpci')
 
         required = {
             'locality_number': locality_num_idx,
@@ -385,29 +579,42 @@ def parse_gpci_csv(csv_path, output_path):
         # Parse data
         gpci_data = {}
 
-        def safe_float(row, idx):
-            if idx is None or idx >= len(row):
-                return None
-            try:
-                val = (row[idx] or '').strip()
-                val = re.sub(r'[^\d.\-]', '', val)
-                return float(val) if val else None
-            except (ValueError, AttributeError):
-                return None
-
-        def safe_str(row, idx):
-            if idx is None or idx >= len(row):
-                return ""
-            return (row[idx] or '').strip()
+        # Per-column cell readers, specialized once per file so the row loop
+        # does not re-check whether each column exists
+        def text_column(idx):
+            """Row -> stripped cell text, "" when the column or cell is missing"""
+            if idx is None:
+                return lambda row: ""
+
+            def get(row):
+                return row[idx].strip() if idx < len(row) else ""
+            return get
+
+        def number_column(idx):
+            """Row -> cell number, None when the column or cell is missing"""
+            if idx is None:
+                return lambda row: None
+
+            def get(row):
+                return parse_number(row[idx], None) if idx < len(row) else None
+            return get
+
+        get_state = text_column(state_idx)
+        get_locality_num = text_column(locality_num_idx)
+        get_locality_name = text_column(locality_name_idx)
+        get_mac = text_column(mac_idx)
+        get_work_gpci = number_column(work_gpci_idx)
+        get_pe_gpci = number_column(pe_gpci_idx)
+        get_mp_gpci = number_column(mp_gpci_idx)
 
         skipped = 0
         for row in data_rows:
             if not row:
                 continue
 
-            state = safe_str(row, state_idx) if state_idx is not None else ''
-            locality_num = safe_str(row, locality_num_idx)
-            locality_name = safe_str(row, locality_name_idx)
+            state = get_state(row)
+            locality_num = get_locality_num(row)
+            locality_name = get_locality_name(row)
 
             # Skip non-data lines / notes
             if not locality_num or not locality_name:
@@ -420,15 +627,19 @@ def parse_gpci_csv(csv_path, output_path):
             if not state:
                 state = derive_state_from_name(locality_name)
 
-            work_gpci = safe_float(row, work_gpci_idx)
-            pe_gpci = safe_float(row, pe_gpci_idx)
-            mp_gpci = safe_float(row, mp_gpci_idx)
+            work_gpci = get_work_gpci(row)
+            pe_gpci = get_pe_gpci(row)
+            mp_gpci = get_mp_gpci(row)
             if work_gpci is None or pe_gpci is None or mp_gpci is None:
                 skipped += 1
                 continue
 
-            # Stable unique key across years.
-            locality_key = str(int(float(locality_num))) if locality_num.replace('.', '', 1).isdigit() else locality_num
+            # Stable unique key across years ("01" and "1.0" both become "1").
+            # int() truncates, so a fractional number like "1.5" keys as "1".
+            try:
+                locality_key = str(int(float(locality_num)))
+            except (ValueError, OverflowError):
+                locality_key = locality_num
             key = f"{state}-{locality_key}" if state else f"{locality_name}-{locality_key}"
 
             gpci_data[key] = {
@@ -439,10 +650,9 @@ def parse_gpci_csv(csv_path, output_path):
                 "pe_gpci": pe_gpci,
                 "mp_gpci": mp_gpci,
             }
-            if mac_idx is not None:
-                mac = safe_str(row, mac_idx)
-                if mac:
-                    gpci_data[key]["mac"] = mac
+            mac = get_mac(row)
+            if mac:
+                gpci_data[key]["mac"] = mac
 
         print(f"\nParsed {len(gpci_data)} localities")
         if skipped:
@@ -450,8 +660,7 @@ def parse_gpci_csv(csv_path, output_path):
 
         # Write JSON
         print(f"\nWriting JSON to: {output_path}")
-        with open(output_path, 'w') as out:
-            json.dump(gpci_data, out, indent=2)
+        write_json(gpci_data, output_path)
 
         print(f"✓ Success! Created {output_path}")
 
@@ -468,6 +677,30 @@ def parse_gpci_csv(csv_path, output_path):
             print(f"  MP: {gpci_data[utah_key]['mp_gpci']}")
 
 
+def parse_file(input_file, output_file):
+    """Parse one CMS RVU or GPCI CSV into JSON and return an exit code.
+
+    Lets build_all_data.py parse in-process; the parsers' sys.exit() calls
+    are turned into a non-zero return value instead of ending the caller.
+    """
+    if not Path(input_file).exists():
+        print(f"ERROR: Input file not found: {input_file}")
+        return 1
+
+    # Create output directory if needed
+    Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+
+    try:
+        # Detect file type based on output name or user choice
+        if 'gpci' in str(output_file).lower():
+            parse_gpci_csv(input_file, output_file)
+        else:
+            parse_rvu_csv(input_file, output_file)
+    except SystemExit as exc:
+        return exc.code if isinstance(exc.code, int) else 1
+    return 0
+
+
 def main():
     if len(sys.argv) < 3:
         print(__doc__)
@@ -478,21 +711,7 @@ def main():
         print("    python parse_cms_data.py gpci_file.csv data/gpci_data.json")
         sys.exit(1)
 
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
-
-    if not Path(input_file).exists():
-        print(f"ERROR: Input file not found: {input_file}")
-        sys.exit(1)
-
-    # Create output directory if needed
-    Path(output_file).parent.mkdir(parents=True, exist_ok=True)
-
-    # Detect file type based on output name or user choice
-    if 'gpci' in output_file.lower():
-        parse_gpci_csv(input_file, output_file)
-    else:
-        parse_rvu_csv(input_file, output_file)
+    sys.exit(parse_file(sys.argv[1], sys.argv[2]))
 
 
 if __name__ == '__main__':
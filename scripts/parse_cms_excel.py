@@ -7,37 +7,73 @@ Parses actual CMS Excel files (PPRRVU and GPCI) into JSON format for the RVU Cal
 Usage:
     python parse_cms_excel.py PPRRVU22_JAN.xlsx data/rvu_data.json
     python parse_cms_excel.py GPCI2022.xlsx data/gpci_data.json
+
+Uses python-calamine (Rust-backed reader) when installed, otherwise openpyxl.
 """
 
-import openpyxl
-import json
 import sys
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
 
+from parse_cms_data import write_json, write_rvu_json
 
-def parse_rvu_excel(excel_path, output_path, limit=None):
-    """Parse CMS PPRRVU Excel file into JSON format"""
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # optional speedup; openpyxl is the baseline reader
+    CalamineWorkbook = None
 
-    print(f"Reading RVU Excel file: {excel_path}")
-    wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
 
-    # Get the first (and usually only) sheet
+def read_first_sheet(excel_path, max_col=None):
+    """Return (sheet name, iterator of row values) for the workbook's first sheet
+
+    openpyxl stops parsing each row after `max_col` columns; calamine rows are
+    returned whole.
+    """
+    if CalamineWorkbook is not None:
+        wb = CalamineWorkbook.from_path(excel_path)
+        sheet = wb.get_sheet_by_index(0)
+        # iter_rows streams rows instead of building the whole sheet as lists,
+        # but its columns start at the first used cell. CMS sheets start at A1;
+        # anything else is materialized with positions anchored at A1.
+        if sheet.start == (0, 0):
+            return wb.sheet_names[0], sheet.iter_rows()
+        return wb.sheet_names[0], iter(sheet.to_python(skip_empty_area=False))
+
+    import openpyxl
+
+    wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
     sheet_name = wb.sheetnames[0]
-    sheet = wb[sheet_name]
-    print(f"Using sheet: {sheet_name}")
+    return sheet_name, wb[sheet_name].iter_rows(max_col=max_col, values_only=True)
 
-    # Find header row (contains "HCPCS" in first column)
-    header_row = None
-    for i, row in enumerate(sheet.iter_rows(min_row=1, max_row=20, values_only=True), 1):
-        if row[0] and str(row[0]).strip().upper() == 'HCPCS':
-            header_row = i
-            print(f"Found header row at line {i}")
-            print(f"Headers: {[str(cell).strip() if cell else '' for cell in row[:15]]}")
-            break
 
-    if not header_row:
-        print("ERROR: Could not find header row with 'HCPCS'")
-        sys.exit(1)
+def cell_float(val, default):
+    """Numeric value of a cell, or `default` when it is empty or not a number"""
+    # Fast path: numeric cells already come back as float
+    if val.__class__ is float:
+        return val
+    if val is None or val == '':
+        return default
+    try:
+        return float(val)
+    except (ValueError, TypeError):
+        return default
+
+
+def cell_text(val):
+    """Stripped text of a cell ("" when empty)"""
+    if not val:
+        return ""
+    # calamine reads every number as float; print whole numbers like openpyxl does
+    if isinstance(val, float) and val.is_integer():
+        val = int(val)
+    return str(val).strip()
+
+
+def parse_rvu_excel(excel_path, output_path, limit=None):
+    """Parse CMS PPRRVU Excel file into JSON format"""
+
+    print(f"Reading RVU Excel file: {excel_path}")
 
     # Column indices (0-based after we account for header row)
     # Based on PPRRVU22_JAN.xlsx inspection:
@@ -55,53 +91,58 @@ def parse_rvu_excel(excel_path, output_path, limit=None):
     PE_FAC_COL = 8
     MP_COL = 10
 
-    rvu_data = {}
+    # Get the first (and usually only) sheet; nothing right of MP RVU is used
+    sheet_name, rows = read_first_sheet(excel_path, max_col=MP_COL + 1)
+    print(f"Using sheet: {sheet_name}")
+
+    # Find header row (contains "HCPCS" in first column); data rows follow on
+    # the same iterator
+    header_row = None
+    for i, row in enumerate(islice(rows, 20), 1):
+        if row[0] and str(row[0]).strip().upper() == 'HCPCS':
+            header_row = i
+            print(f"Found header row at line {i}")
+            print(f"Headers: {[str(cell).strip() if cell else '' for cell in row[:15]]}")
+            break
+
+    if not header_row:
+        print("ERROR: Could not find header row with 'HCPCS'")
+        sys.exit(1)
+
     skipped = 0
     parsed = 0
+    sample_codes = ['99213', '99214', '99215', '99203', '99204']
 
-    print(f"\nParsing data rows (starting from row {header_row + 1})...")
+    # One C-level call pulls the six used cells out of each row
+    pick_cells = itemgetter(HCPCS_COL, DESC_COL, WORK_COL, PE_NONFAC_COL, PE_FAC_COL, MP_COL)
 
-    for row_num, row in enumerate(sheet.iter_rows(min_row=header_row + 1, values_only=True), header_row + 1):
-        try:
-            if not row or len(row) <= MP_COL:
-                continue
+    def records():
+        """RVU tuples for each usable data row, up to `limit`"""
+        nonlocal skipped, parsed
+        for row_num, row in enumerate(rows, header_row + 1):
+            try:
+                if not row or len(row) <= MP_COL:
+                    continue
 
-            # Get CPT/HCPCS code
-            cpt_code = row[HCPCS_COL]
-            if not cpt_code:
-                continue
+                code_cell, desc_cell, work_rvu, pe_nonfac, pe_fac, mp_rvu = pick_cells(row)
 
-            cpt_code = str(cpt_code).strip()
+                # Get CPT/HCPCS code
+                cpt_code = cell_text(code_cell)
 
-            # Skip non-alphanumeric codes or very long codes
-            if not cpt_code or len(cpt_code) > 10:
-                continue
+                # Skip non-alphanumeric codes or very long codes
+                if not cpt_code or len(cpt_code) > 10:
+                    continue
 
-            # Get description
-            desc = str(row[DESC_COL]).strip() if row[DESC_COL] else ""
-
-            # Parse numeric values
-            def safe_float(val):
-                if val is None or val == '':
-                    return 0.0
-                try:
-                    return float(val)
-                except (ValueError, TypeError):
-                    return 0.0
-
-            work_rvu = safe_float(row[WORK_COL])
-            pe_nonfac = safe_float(row[PE_NONFAC_COL])
-            pe_fac = safe_float(row[PE_FAC_COL])
-            mp_rvu = safe_float(row[MP_COL])
-
-            rvu_data[cpt_code] = {
-                "desc": desc,
-                "work_rvu": work_rvu,
-                "pe_rvu_fac": pe_fac,
-                "pe_rvu_nonfac": pe_nonfac,
-                "mp_rvu": mp_rvu
-            }
+                record = (cpt_code, cell_text(desc_cell), cell_float(work_rvu, 0.0),
+                          cell_float(pe_fac, 0.0), cell_float(pe_nonfac, 0.0), cell_float(mp_rvu, 0.0))
 
+            except Exception as e:
+                skipped += 1
+                if skipped <= 5:
+                    print(f"Warning: Skipped row {row_num}: {e}")
+                continue
+
+            yield record
             parsed += 1
 
             # Show progress every 1000 rows
@@ -113,47 +154,56 @@ def parse_rvu_excel(excel_path, output_path, limit=None):
                 print(f"  Reached limit of {limit} codes")
                 break
 
-        except Exception as e:
-            skipped += 1
-            if skipped <= 5:
-                print(f"Warning: Skipped row {row_num}: {e}")
+    # Codes are streamed to the output as they complete (see write_rvu_json)
+    print(f"\nWriting JSON to: {output_path}")
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+
+    print(f"\nParsing data rows (starting from row {header_row + 1})...")
+    code_count, writer = write_rvu_json(records(), output_path, keep_codes=sample_codes)
 
-    print(f"\n✓ Parsed {parsed} CPT/HCPCS codes")
+    print(f"\n✓ Parsed {parsed} CPT/HCPCS codes ({code_count} unique)")
     if skipped > 0:
         print(f"  Skipped {skipped} rows due to errors")
 
-    # Write JSON
-    print(f"\nWriting JSON to: {output_path}")
-    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, 'w') as f:
-        json.dump(rvu_data, f, indent=2)
-
     print(f"✓ Success! Created {output_path}")
 
     # Show sample codes
     print(f"\nSample codes included:")
-    sample_codes = ['99213', '99214', '99215', '99203', '99204']
     for code in sample_codes:
-        if code in rvu_data:
-            print(f"  {code}: {rvu_data[code]['desc'][:60]}...")
-            print(f"    Work: {rvu_data[code]['work_rvu']}, PE NF: {rvu_data[code]['pe_rvu_nonfac']}, PE F: {rvu_data[code]['pe_rvu_fac']}, MP: {rvu_data[code]['mp_rvu']}")
+        record = writer.kept.get(code)
+        if record:
+            print(f"  {code}: {record['desc'][:60]}...")
+            print(f"    Work: {record['work_rvu']}, PE NF: {record['pe_rvu_nonfac']}, PE F: {record['pe_rvu_fac']}, MP: {record['mp_rvu']}")
 
-    return rvu_data
+    return code_count
 
 
 def parse_gpci_excel(excel_path, output_path):
     """Parse CMS GPCI Excel file into JSON format"""
 
     print(f"Reading GPCI Excel file: {excel_path}")
-    wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
 
-    sheet_name = wb.sheetnames[0]
-    sheet = wb[sheet_name]
+    # Column indices based on GPCI2022.xlsx:
+    # Col B=1: State
+    # Col C=2: Locality Number
+    # Col D=3: Locality Name
+    # Col E=4: PW GPCI (Work)
+    # Col F=5: PE GPCI
+    # Col G=6: MP GPCI
+
+    STATE_COL = 1
+    LOCALITY_COL = 2
+    NAME_COL = 3
+    WORK_GPCI_COL = 4
+    PE_GPCI_COL = 5
+    MP_GPCI_COL = 6
+
+    sheet_name, rows = read_first_sheet(excel_path, max_col=MP_GPCI_COL + 1)
     print(f"Using sheet: {sheet_name}")
 
     # Find header row (contains "State" or "Locality Number")
     header_row = None
-    for i, row in enumerate(sheet.iter_rows(min_row=1, max_row=10, values_only=True), 1):
+    for i, row in enumerate(islice(rows, 10), 1):
         if row and len(row) > 2:
             # Check if this looks like the header row
             if any(cell and 'State' in str(cell) for cell in row):
@@ -166,50 +216,27 @@ def parse_gpci_excel(excel_path, output_path):
         print("ERROR: Could not find header row")
         sys.exit(1)
 
-    # Column indices based on GPCI2022.xlsx:
-    # Col B=1: State
-    # Col C=2: Locality Number
-    # Col D=3: Locality Name
-    # Col E=4: PW GPCI (Work)
-    # Col F=5: PE GPCI
-    # Col G=6: MP GPCI
-
-    STATE_COL = 1
-    LOCALITY_COL = 2
-    NAME_COL = 3
-    WORK_GPCI_COL = 4
-    PE_GPCI_COL = 5
-    MP_GPCI_COL = 6
-
     gpci_data = {}
     skipped = 0
 
     print(f"\nParsing GPCI data...")
 
-    for row_num, row in enumerate(sheet.iter_rows(min_row=header_row + 1, values_only=True), header_row + 1):
+    for row_num, row in enumerate(rows, header_row + 1):
         try:
             if not row or len(row) <= MP_GPCI_COL:
                 continue
 
-            state = str(row[STATE_COL]).strip() if row[STATE_COL] else ""
-            locality = str(row[LOCALITY_COL]).strip() if row[LOCALITY_COL] else ""
-            name = str(row[NAME_COL]).strip() if row[NAME_COL] else ""
+            state = cell_text(row[STATE_COL])
+            locality = cell_text(row[LOCALITY_COL])
+            name = cell_text(row[NAME_COL])
 
             if not state or not locality:
                 continue
 
             # Parse GPCI values
-            def safe_float(val):
-                if val is None or val == '':
-                    return 1.000
-                try:
-                    return float(val)
-                except (ValueError, TypeError):
-                    return 1.000
-
-            work_gpci = safe_float(row[WORK_GPCI_COL])
-            pe_gpci = safe_float(row[PE_GPCI_COL])
-            mp_gpci = safe_float(row[MP_GPCI_COL])
+            work_gpci = cell_float(row[WORK_GPCI_COL], 1.000)
+            pe_gpci = cell_float(row[PE_GPCI_COL], 1.000)
+            mp_gpci = cell_float(row[MP_GPCI_COL], 1.000)
 
             # Create locality key (use state code for single-locality states, or state+locality for others)
             # For simplicity, we'll use just the state code as key
@@ -239,8 +266,7 @@ def parse_gpci_excel(excel_path, output_path):
     # Write JSON
     print(f"\nWriting JSON to: {output_path}")
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, 'w') as f:
-        json.dump(gpci_data, f, indent=2)
+    write_json(gpci_data, output_path)
 
     print(f"✓ Success! Created {output_path}")
 
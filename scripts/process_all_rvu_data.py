@@ -1,17 +1,46 @@
 #!/usr/bin/env python3
 """
 Process all 7 years of RVU data from CMS CSV files to JSON
+
+A year is skipped when its CSV and the parser hash to the same causal key
+recorded in the build cache shared with build_all_data.py; pass --force to
+rebuild every year.
 """
 
+import codecs
 import csv
+import gzip
+import hashlib
+import io
 import json
 import os
+import shutil
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
 
+import build_all_data
+import build_rvu_timeline
+import parse_cms_data
+from parse_cms_data import write_rvu_json
+
 # Source and output directories
 SOURCE_DIR = "/Users/philipsun/Downloads/Validation/Granger work Folder/RVU Look up/RVU DATA/RVUs by year"
 OUTPUT_DIR = "app/data/processed"
 
+# Consolidated all-years file the SPA loads in a single request
+TIMELINE_NAME = "rvu_timeline_2019_2025.json"
+
+# Binary copy of the timeline (float32 columns, dictionary-encoded
+# descriptions) for analysis tools, written when pyarrow is installed
+TIMELINE_FORMATS = ("json", "parquet") if build_rvu_timeline.pa is not None else ("json",)
+
+# Years are independent, so each one gets its own worker process
+MAX_WORKERS = min(7, os.cpu_count() or 1)
+
 # File mappings
 FILES = {
     2019: "PPRRVU19_OCT.csv",
@@ -23,10 +52,107 @@ FILES = {
     2025: "PPRRVU2025_Oct.csv"
 }
 
-def process_year(year, filename):
-    """Process a single year of RVU data"""
+# Chunk size for the pass that hashes each CSV and validates it as UTF-8
+SCAN_CHUNK_SIZE = 1 << 20
+
+# Per CSV (keyed by its SHA-256): the encoding the stream position was taken
+# under, the position after the 10-row preamble and the first data line, so
+# later runs over an unchanged file seek straight to the data rows
+HEADER_CACHE_NAME = ".csv_headers.json"
+
+# Memoized for the same reason as parse_cms_data.rvu_number, but strict: a
+# cell that is not a plain number skips the row instead of becoming 0.0
+@lru_cache(maxsize=1 << 16)
+def rvu_float(cell):
+    """Float value of a raw RVU cell, 0.0 when blank. Invalid text raises ValueError."""
+    # float() ignores surrounding whitespace itself, so the cell is not stripped
+    return float(cell) if cell and not cell.isspace() else 0.0
+
+# A year's output is rebuilt when its CSV or the code that parses it changes
+PARSER_SOURCES = (__file__, parse_cms_data.__file__)
+
+def load_header_cache(cache_path):
+    """Load the {CSV filename: header info} map from the last run"""
+    try:
+        return parse_cms_data.decode_json(Path(cache_path).read_bytes())
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        print(f"WARNING: Ignoring unreadable header cache: {cache_path}")
+        return {}
+
+def save_header_cache(cache, cache_path):
+    """Atomically write the header cache (tmpfile + os.replace)"""
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_path, cache_path)
+
+def scan_csv(path):
+    """(SHA-256 hex digest, encoding) of a CSV, from a single read of the file.
+
+    A BOM means utf-8-sig. Otherwise the whole file is checked: utf-8 if it
+    all decodes, else cp1252 (CMS preambles are ASCII, so the first non-UTF-8
+    byte can sit anywhere in the body).
+    """
+    digest = hashlib.sha256()
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    encoding = None
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(SCAN_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            if encoding is None and chunk.startswith(codecs.BOM_UTF8):
+                encoding = 'utf-8-sig'
+            elif encoding is None:
+                try:
+                    decoder.decode(chunk)
+                except UnicodeDecodeError:
+                    encoding = 'cp1252'
+    if encoding is None:
+        try:
+            decoder.decode(b'', final=True)
+            encoding = 'utf-8'
+        except UnicodeDecodeError:
+            encoding = 'cp1252'
+    return digest.hexdigest(), encoding
+
+def seek_data_rows(f, header):
+    """Seek f to a cached header entry's data offset, if the first data line is there.
+
+    The offset is an opaque TextIOWrapper.tell() cookie, so it is trusted
+    only when the line it lands on matches the stored first data line.
+    """
+    try:
+        f.seek(header['data_offset'])
+        if f.readline() == header['first_row']:
+            f.seek(header['data_offset'])
+            return True
+    except (KeyError, TypeError, ValueError, OverflowError, OSError):
+        pass
+    return False
+
+def write_gzip_copy(path):
+    """Write a pre-compressed path + '.gz' for serve.py to send to gzip-capable browsers"""
+    with open(path, 'rb') as src, gzip.open(path + '.gz', 'wb', compresslevel=9) as dst:
+        shutil.copyfileobj(src, dst)
+
+def process_year(year, filename, force=False, build_cache=None, headers=None):
+    """Process a single year of RVU data, unless its output is already current.
+
+    `build_cache` maps output filenames to causal keys (see
+    build_all_data.causal_key); the year is skipped when its key is unchanged
+    and recorded after a successful run. `headers` is the header cache (see
+    HEADER_CACHE_NAME); this year's entry is reused when the CSV is unchanged
+    and refreshed otherwise.
+    """
+    if build_cache is None:
+        build_cache = {}
+    if headers is None:
+        headers = {}
     input_path = os.path.join(SOURCE_DIR, filename)
-    output_path = os.path.join(OUTPUT_DIR, f"rvu_data_{year}.json")
+    output_name = f"rvu_data_{year}.json"
+    output_path = os.path.join(OUTPUT_DIR, output_name)
 
     print(f"\n{'='*60}")
     print(f"Processing {year}: {filename}")
@@ -37,89 +163,118 @@ def process_year(year, filename):
         print(f"❌ ERROR: File not found: {input_path}")
         return False
 
-    rvu_data = {}
+    # Content hashes, not mtimes: unpacking a release or copying with
+    # preserved timestamps can leave a changed CSV looking older
+    csv_digest, encoding = scan_csv(input_path)
+    key = build_all_data.combine_digests([csv_digest, *map(build_all_data.file_sha256, PARSER_SOURCES)])
+    if (not force and build_cache.get(output_name) == key
+            and os.path.exists(output_path) and os.path.exists(output_path + '.gz')):
+        print(f"✓ Up to date: {output_path} (use --force to rebuild)")
+        return True
 
-    # Try multiple encodings
-    encodings_to_try = ['utf-8-sig', 'utf-8', 'latin-1', 'cp1252']
-    f = None
-    for encoding in encodings_to_try:
-        try:
-            f = open(input_path, 'r', encoding=encoding, errors='replace')
-            # Try reading to verify encoding works
-            _ = f.read(1000)
-            f.close()
-            # Reopen for actual processing
-            f = open(input_path, 'r', encoding=encoding, errors='replace')
-            print(f"  Using encoding: {encoding}")
-            break
-        except Exception as e:
-            if f:
-                f.close()
-            f = None
-            continue
-
-    if f is None:
-        print(f"❌ ERROR: Could not open file with any encoding")
-        return False
+    sample_codes = ['99213', '99214', '99215']
+
+    # A cached header entry only applies to the exact CSV content, and the
+    # encoding its stream position was taken under
+    header = headers.get(filename)
+    if header is not None and (header.get('source') != csv_digest or header.get('encoding') != encoding):
+        header = None
 
-    with f:
+    # The encoding came from the hashing pass (see scan_csv). Bytes cp1252
+    # leaves undefined are still replaced rather than failing the year.
+    print(f"  Using encoding: {encoding}")
+
+    with open(input_path, 'r', encoding=encoding, errors='replace') as f:
+        if header is not None and not seek_data_rows(f, header):
+            print(f"  WARNING: Cached data offset for {filename} is stale, re-scanning the preamble")
+            f.seek(0)
+            header = None
+        if header is None:
+            # Skip first 10 header rows as raw lines, before the csv parser
+            # sees them (the CMS preamble has no quoted line breaks)
+            for _ in range(10):
+                f.readline()
+            data_offset = f.tell()
+            headers[filename] = {'source': csv_digest, 'encoding': encoding,
+                                 'data_offset': data_offset, 'first_row': f.readline()}
+            f.seek(data_offset)
+
+        # csv.reader tokenizes in C straight off the buffered stream; mapping
+        # the whole file and decoding it up front measured slower, not faster
         reader = csv.reader(f)
 
-        # Skip first 10 header rows
-        for _ in range(10):
-            next(reader)
+        # Col 0: HCPCS, 2: DESCRIPTION, 5: WORK RVU, 6: PE RVU NON-FAC,
+        # 8: PE RVU FACILITY, 10: MP RVU -- pulled out in one C-level call
+        pick_columns = itemgetter(0, 2, 5, 6, 8, 10)
 
         count = 0
-        for row in reader:
-            try:
-                if len(row) < 11:
-                    continue
 
-                cpt_code = row[0].strip()
-                if not cpt_code:
-                    continue
+        def records():
+            """RVU tuples for each usable data row"""
+            nonlocal count
+            for row in reader:
+                try:
+                    if len(row) < 11:
+                        continue
 
-                # Extract RVU values
-                work_rvu = float(row[5].strip() or 0)
-                pe_nonfac = float(row[6].strip() or 0)
-                pe_fac = float(row[8].strip() or 0)
-                mp_rvu = float(row[10].strip() or 0)
+                    cpt_code, description, work_rvu, pe_nonfac, pe_fac, mp_rvu = pick_columns(row)
+                    cpt_code = cpt_code.strip()
+                    if not cpt_code:
+                        continue
 
-                # Get description
-                description = row[2].strip()
+                    # Extract RVU values
+                    record = (cpt_code, description.strip(),
+                              rvu_float(work_rvu), rvu_float(pe_fac),
+                              rvu_float(pe_nonfac), rvu_float(mp_rvu))
 
-                rvu_data[cpt_code] = {
-                    "desc": description,
-                    "work_rvu": work_rvu,
-                    "pe_rvu_fac": pe_fac,
-                    "pe_rvu_nonfac": pe_nonfac,
-                    "mp_rvu": mp_rvu
-                }
+                except (ValueError, IndexError) as e:
+                    continue
+
+                yield record
 
                 count += 1
                 if count % 2000 == 0:
                     print(f"  Processed {count} codes...")
 
-            except (ValueError, IndexError) as e:
-                continue
+        # Records stream to the output as each code completes instead of
+        # being collected into a dict first (see parse_cms_data.write_rvu_json)
+        code_count, writer = write_rvu_json(records(), output_path, keep_codes=sample_codes)
 
-    # Write JSON output
-    with open(output_path, 'w') as f:
-        json.dump(rvu_data, f, indent=2)
+    write_gzip_copy(output_path)
 
-    print(f"✓ Completed: {count} codes written to {output_path}")
+    print(f"✓ Completed: {count} rows, {code_count} codes written to {output_path}")
 
     # Show sample verification data
-    sample_codes = ['99213', '99214', '99215']
     print(f"\nSample data for {year}:")
     for code in sample_codes:
-        if code in rvu_data:
-            data = rvu_data[code]
+        data = writer.kept.get(code)
+        if data:
             print(f"  {code}: Work={data['work_rvu']:.2f}, PE(Fac)={data['pe_rvu_fac']:.2f}, PE(NonFac)={data['pe_rvu_nonfac']:.2f}, MP={data['mp_rvu']:.2f}")
 
+    build_cache[output_name] = key
     return True
 
-def main():
+def _process_year_captured(item):
+    """Run process_year for a (year, filename, force, key, header) tuple in a worker process.
+
+    `key` and `header` are the year's build cache and header cache entries.
+    Returns (success, captured output, key, header) so the parent can print
+    each year's log in order and save both caches once.
+    """
+    year, filename, force, key, header = item
+    output_name = f"rvu_data_{year}.json"
+    build_cache = {output_name: key} if key is not None else {}
+    headers = {filename: header} if header is not None else {}
+    out = io.StringIO()
+    with redirect_stdout(out):
+        try:
+            ok = process_year(year, filename, force, build_cache, headers)
+        except Exception:  # noqa: BLE001
+            traceback.print_exc(file=out)
+            ok = False
+    return ok, out.getvalue(), build_cache.get(output_name), headers.get(filename)
+
+def main(force=False):
     print("="*60)
     print("RVU DATA PROCESSOR - ALL YEARS (2019-2025)")
     print("="*60)
@@ -127,11 +282,25 @@ def main():
     # Create output directory if needed
     Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
 
-    # Process each year
+    # Process the years in parallel; map yields results in year order, so
+    # each year's log still prints as one uninterrupted block
+    build_cache_path = os.path.join(OUTPUT_DIR, build_all_data.BUILD_CACHE_NAME)
+    build_cache = build_all_data.load_build_cache(build_cache_path)
+    header_cache_path = os.path.join(OUTPUT_DIR, HEADER_CACHE_NAME)
+    headers = load_header_cache(header_cache_path)
+    years = [(year, filename, force, build_cache.get(f"rvu_data_{year}.json"), headers.get(filename))
+             for year, filename in sorted(FILES.items())]
     success_count = 0
-    for year in sorted(FILES.keys()):
-        if process_year(year, FILES[year]):
-            success_count += 1
+    with ProcessPoolExecutor(max_workers=min(MAX_WORKERS, len(years))) as executor:
+        for (year, filename, *_), (ok, output, key, header) in zip(years, executor.map(_process_year_captured, years)):
+            print(output, end='')
+            success_count += ok
+            if ok and key is not None:
+                build_cache[f"rvu_data_{year}.json"] = key
+            if header is not None:
+                headers[filename] = header
+    build_all_data.save_build_cache(build_cache, build_cache_path)
+    save_header_cache(headers, header_cache_path)
 
     # Final summary
     print("\n" + "="*60)
@@ -140,9 +309,22 @@ def main():
 
     if success_count == len(FILES):
         print("\n✓ All RVU data files processed successfully!")
+
+        # All years in one consolidated file, fetched by the SPA in one request
+        print(f"\nBuilding {TIMELINE_NAME}\n")
+        timeline_path = os.path.join(OUTPUT_DIR, TIMELINE_NAME)
+        year_pairs = [(str(year), os.path.join(OUTPUT_DIR, f"rvu_data_{year}.json")) for year in sorted(FILES)]
+        if build_rvu_timeline.run(year_pairs, timeline_path, formats=TIMELINE_FORMATS) != 0:
+            print(f"\n⚠️  Failed to build {TIMELINE_NAME}")
+            return 1
+        write_gzip_copy(timeline_path)
+
         print(f"\nGenerated files in {OUTPUT_DIR}/:")
         for year in sorted(FILES.keys()):
             print(f"  - rvu_data_{year}.json")
+        print(f"  - {TIMELINE_NAME}")
+        if "parquet" in TIMELINE_FORMATS:
+            print(f"  - {Path(TIMELINE_NAME).with_suffix('.parquet')}")
         print("\nNext steps:")
         print("  1. Restart the RVU Calculator server")
         print("  2. Refresh browser (Cmd+Shift+R)")
@@ -155,4 +337,4 @@ def main():
 
 if __name__ == "__main__":
     import sys
-    sys.exit(main())
+    sys.exit(main(force='--force' in sys.argv[1:]))
@@ -12,12 +12,13 @@ Default port: 8000
 Then open: http://localhost:8000
 """
 
+import email.utils
 import http.server
-import socketserver
 import sys
 import os
 import webbrowser
 from pathlib import Path
+from urllib.parse import urlsplit
 
 # Serve the shipping SPA from app/
 repo_root = Path(__file__).resolve().parent.parent
@@ -32,18 +33,89 @@ Handler = http.server.SimpleHTTPRequestHandler
 
 # Add CORS headers to allow local development
 class CORSRequestHandler(Handler):
+    # Keep connections open between requests, so the page, its scripts and
+    # the data files reuse one TCP connection (every response sets
+    # Content-Length, which HTTP/1.1 keep-alive needs)
+    protocol_version = "HTTP/1.1"
+
     def end_headers(self):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET')
-        self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate')
+        # Browsers may keep files but must revalidate them on every use; an
+        # unchanged file is answered with 304 Not Modified and no body
+        self.send_header('Cache-Control', 'no-cache')
+        # A .json URL may be answered gzipped or not depending on the request
+        # (see send_head), so caches must key every response on Accept-Encoding
+        if urlsplit(self.path).path.endswith('.json'):
+            self.send_header('Vary', 'Accept-Encoding')
         return super().end_headers()
 
+    def not_modified_since(self, mtime):
+        """True when the request's If-Modified-Since covers a file modified at mtime"""
+        ims = self.headers.get('If-Modified-Since')
+        if not ims or 'If-None-Match' in self.headers:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(ims).timestamp()
+        except (TypeError, IndexError, OverflowError, ValueError):
+            return False
+        return int(mtime) <= since
+
+    def send_head(self):
+        """Send a pre-compressed .json.gz sibling when the client accepts gzip.
+
+        The .gz is only used while it is at least as new as the .json, so a
+        rebuild that rewrote just the .json is never shadowed by a stale copy.
+        """
+        path = self.translate_path(self.path)
+        if path.endswith('.json') and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            try:
+                gz = open(path + '.gz', 'rb')
+            except OSError:
+                gz = None
+            if gz is not None:
+                gz_stat = os.fstat(gz.fileno())
+                try:
+                    fresh = gz_stat.st_mtime >= os.stat(path).st_mtime
+                except OSError:
+                    fresh = False
+                if fresh and self.not_modified_since(gz_stat.st_mtime):
+                    gz.close()
+                    self.send_response(304)
+                    self.end_headers()
+                    return None
+                if fresh:
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Encoding', 'gzip')
+                    self.send_header('Content-Length', str(gz_stat.st_size))
+                    self.send_header('Last-Modified', self.date_time_string(gz_stat.st_mtime))
+                    self.end_headers()
+                    return gz
+                gz.close()
+        return super().send_head()
+
+    def copyfile(self, source, outputfile):
+        """Copy a response body to the client.
+
+        Bodies headed for the socket go through socket.sendfile(), which uses
+        os.sendfile() for real files so the kernel copies them straight from
+        the page cache; it falls back to plain sends for in-memory bodies such
+        as directory listings.
+        """
+        if outputfile is self.wfile:
+            self.connection.sendfile(source)
+        else:
+            super().copyfile(source, outputfile)
+
     def log_message(self, format, *args):
         # Simplified logging
         print(f"[{self.log_date_time_string()}] {format % args}")
 
 try:
-    with socketserver.TCPServer(("", PORT), CORSRequestHandler) as httpd:
+    # One thread per connection, so the page and its data files load in
+    # parallel instead of queueing behind each other
+    with http.server.ThreadingHTTPServer(("", PORT), CORSRequestHandler) as httpd:
         print(f"""
 ╔════════════════════════════════════════════════════════╗
 ║         RVU Calculator - Local Server                  ║
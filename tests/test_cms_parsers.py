@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Parser regression tests against tests/fixtures/pprrvu_modifiers.csv.
+
+The fixture is a PPRRVU-style export: the 9-line preamble plus header row,
+a code with a modifier row (the last row of a group wins), and two codes
+that reappear later (their last row wins, but the key is written once, in
+its first position).
+
+Run with: python3 tests/test_cms_parsers.py
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = REPO_ROOT / 'tests' / 'fixtures'
+SCRIPTS = REPO_ROOT / 'scripts'
+FIXTURE_CSV = FIXTURES / 'pprrvu_modifiers.csv'
+
+sys.path.insert(0, str(SCRIPTS))
+
+import build_all_data  # noqa: E402
+import parse_cms_data  # noqa: E402
+import process_all_rvu_data  # noqa: E402
+
+
+def load_output(path):
+    """Load a parser's JSON output, failing on duplicate keys"""
+    def no_duplicates(pairs):
+        keys = [key for key, _ in pairs]
+        assert len(keys) == len(set(keys)), f"{path}: duplicate keys {keys}"
+        return dict(pairs)
+
+    with open(path, encoding='utf-8') as f:
+        return json.load(f, object_pairs_hook=no_duplicates)
+
+
+def assert_expected(path):
+    expected = load_output(FIXTURES / 'pprrvu_modifiers_expected.json')
+    actual = load_output(path)
+    assert actual == expected, f"{path}: {actual}"
+    assert list(actual) == list(expected), f"{path}: key order {list(actual)}"
+
+
+def write_header_first_csv(tmp):
+    """Copy of the fixture without its preamble, as parse_rvu_csv expects"""
+    lines = FIXTURE_CSV.read_text(encoding='utf-8').splitlines(keepends=True)
+    csv_path = tmp / 'pprrvu_header_first.csv'
+    csv_path.write_text(''.join(lines[9:]), encoding='utf-8')
+    return csv_path
+
+
+def test_parse_rvu_csv(tmp):
+    csv_path = write_header_first_csv(tmp)
+    output_path = tmp / 'parse_rvu_csv.json'
+    with contextlib.redirect_stdout(io.StringIO()):
+        parse_cms_data.parse_rvu_csv(str(csv_path), str(output_path))
+    assert_expected(output_path)
+
+
+def test_process_year(tmp):
+    process_all_rvu_data.SOURCE_DIR = str(FIXTURES)
+    process_all_rvu_data.OUTPUT_DIR = str(tmp)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ok = process_all_rvu_data.process_year(2022, FIXTURE_CSV.name, force=True)
+    assert ok
+    assert_expected(tmp / 'rvu_data_2022.json')
+
+
+def test_process_year_content_change(tmp):
+    # A changed CSV is rebuilt even when its mtime is older than the output
+    source_dir = tmp / 'source'
+    source_dir.mkdir()
+    csv_path = source_dir / FIXTURE_CSV.name
+    shutil.copy2(FIXTURE_CSV, csv_path)
+    process_all_rvu_data.SOURCE_DIR = str(source_dir)
+    process_all_rvu_data.OUTPUT_DIR = str(tmp)
+    build_cache = {}
+
+    def run():
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            assert process_all_rvu_data.process_year(2022, csv_path.name, build_cache=build_cache)
+        return out.getvalue()
+
+    assert 'Up to date' not in run()
+    assert 'Up to date' in run()
+    stat = csv_path.stat()
+    csv_path.write_bytes(csv_path.read_bytes().replace(b'Office o/p est mod 30 min', b'Office o/p est mod (revised)'))
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+    assert 'Up to date' not in run()
+    assert 'Office o/p est mod (revised)' in (tmp / 'rvu_data_2022.json').read_text(encoding='utf-8')
+
+
+def test_process_year_stale_header_cache(tmp):
+    # A corrupted data offset is detected and the preamble re-scanned
+    process_all_rvu_data.SOURCE_DIR = str(FIXTURES)
+    process_all_rvu_data.OUTPUT_DIR = str(tmp)
+    headers = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert process_all_rvu_data.process_year(2022, FIXTURE_CSV.name, force=True, headers=headers)
+    data_offset = headers[FIXTURE_CSV.name]['data_offset']
+    headers[FIXTURE_CSV.name]['data_offset'] = 1
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        assert process_all_rvu_data.process_year(2022, FIXTURE_CSV.name, force=True, headers=headers)
+    assert 're-scanning the preamble' in out.getvalue()
+    assert headers[FIXTURE_CSV.name]['data_offset'] == data_offset
+    assert_expected(tmp / 'rvu_data_2022.json')
+
+
+def test_run_parse_tasks_failed_year(tmp):
+    # One worker, so the years queued behind the failure are cancelled
+    csv_path = write_header_first_csv(tmp)
+    build_all_data.MAX_WORKERS = 1
+    build_all_data.BUILD_CACHE_PATH = str(tmp / '.build_cache.json')
+    tasks = [(year, str(csv_path if year != 2021 else tmp / 'missing.csv'),
+              str(tmp / f'rvu_data_{year}.json'), f'key-{year}') for year in range(2019, 2026)]
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        assert not build_all_data.run_parse_tasks(tasks, "RVU", {})
+    assert 'Failed to parse RVU data for 2021' in out.getvalue()
+    cache = build_all_data.load_build_cache()
+    assert cache['rvu_data_2019.json'] == 'key-2019'
+    assert cache['rvu_data_2020.json'] == 'key-2020'
+    assert 'rvu_data_2021.json' not in cache
+
+
+def test_fix_rvu_data(tmp):
+    # fix_rvu_data.py reads and writes fixed paths relative to the working directory
+    (tmp / 'app' / 'data' / 'raw').mkdir(parents=True)
+    (tmp / 'app' / 'data' / 'processed').mkdir(parents=True)
+    shutil.copy(FIXTURE_CSV, tmp / 'app' / 'data' / 'raw' / 'PPRRVU22_JAN.csv')
+    result = subprocess.run([sys.executable, str(SCRIPTS / 'fix_rvu_data.py')], cwd=tmp,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert_expected(tmp / 'app' / 'data' / 'processed' / 'rvu_data_2022.json')
+
+
+def main():
+    for test in (test_parse_rvu_csv, test_process_year, test_process_year_content_change,
+                 test_process_year_stale_header_cache, test_run_parse_tasks_failed_year,
+                 test_fix_rvu_data):
+        with tempfile.TemporaryDirectory(prefix='rvu-parsers-') as tmp:
+            test(Path(tmp))
+        print(f"PASS {test.__name__}")
+
+
+if __name__ == '__main__':
+    main()
@@ -40,6 +40,10 @@ function runBuilder({ years, inputs }) {
     return { parsed, outPath };
 }
 
+function decodeStatus(parsed, status) {
+    return status.map((s) => parsed.meta.status_codes[s]);
+}
+
 function test_status_rules() {
     const fixture2021 = path.resolve(__dirname, 'fixtures/rvu_data_2021.json');
     const fixture2022 = path.resolve(__dirname, 'fixtures/rvu_data_2022.json');
@@ -55,19 +59,23 @@ function test_status_rules() {
     });
 
     assert.deepStrictEqual(parsed.meta.years, [2021, 2022, 2023]);
+    assert.deepStrictEqual(parsed.meta.status_codes, {
+        0: null, 1: 'new', 2: 'existing', 3: 'modified',
+    });
 
     const c99213 = parsed.codes['99213'];
     assert.ok(c99213, 'Expected 99213 in output');
-    assert.deepStrictEqual(c99213.status, ['new', 'modified', 'existing']);
+    assert.deepStrictEqual(decodeStatus(parsed, c99213.status), ['new', 'modified', 'existing']);
 
     const c99745 = parsed.codes['99745'];
     assert.ok(c99745, 'Expected 99745 in output');
-    assert.deepStrictEqual(c99745.status, [null, 'new', 'existing']);
+    assert.deepStrictEqual(c99745.status, [0, 1, 2]);
+    assert.deepStrictEqual(decodeStatus(parsed, c99745.status), [null, 'new', 'existing']);
     assert.strictEqual(c99745.work_rvu[0], null);
 
     const c12345 = parsed.codes['12345'];
     assert.ok(c12345, 'Expected 12345 in output');
-    assert.deepStrictEqual(c12345.status, ['new', 'existing', 'modified']);
+    assert.deepStrictEqual(decodeStatus(parsed, c12345.status), ['new', 'existing', 'modified']);
 
     assert.ok(
         c12345.desc && typeof c12345.desc === 'string',